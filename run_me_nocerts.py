@@ -41,6 +41,11 @@ Manual overrides CSV headers (flexible to case/spacing):
 
 
 import argparse
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from functools import cached_property
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 
@@ -90,6 +95,20 @@ def normalize_name(name: str) -> str:
     parts = [_NICK_MAP.get(p, p) for p in parts if p]
     return " ".join(parts)
 
+# Per-run matching counters (reset and reported by --profile). Counted once per matched name, never
+# inside the per-pair helpers; permutation attempts are only counted while profiling (see profile_run).
+MATCH_COUNTERS: Dict[str, int] = {
+    "top_k_calls": 0,
+    "top_k_exact_hits": 0,
+    "absolute_checks": 0,
+    "composite_scores": 0,
+    "permutation_attempts": 0,
+}
+
+def reset_match_counters() -> None:
+    for key in MATCH_COUNTERS:
+        MATCH_COUNTERS[key] = 0
+
 def name_similarity(a: str, b: str) -> float:
     return SequenceMatcher(None, normalize_name(a), normalize_name(b)).ratio()
 
@@ -139,6 +158,8 @@ def composite_name_score(a: str, b: str) -> float:
 
 
 # --- Absolute name match helper ---
+from itertools import permutations as _token_orders  # profile_run swaps in a counting version
+
 def is_absolute_name_match(a: str, b: str) -> bool:
     """Return True when names are an exact logical match after normalization.
     Treat spacing/punctuation differences and token order as non-issues.
@@ -158,15 +179,10 @@ def is_absolute_name_match(a: str, b: str) -> bool:
     a_flat = _strip_punct_and_spaces(a)
     b_tokens = _tokenize(b)
     if 2 <= len(b_tokens) <= 4:  # avoid combinatorial blow-up
-        try:
-            from itertools import permutations
-        except Exception:
-            permutations = None
-        if permutations:
-            for perm in permutations(b_tokens):
-                cand = "".join(_strip_punct_and_spaces(t) for t in perm)
-                if a_flat == cand:
-                    return True
+        for perm in _token_orders(b_tokens):
+            cand = "".join(_strip_punct_and_spaces(t) for t in perm)
+            if a_flat == cand:
+                return True
     return False
 
 # Strict equality ignoring only spacing/punctuation (no token reordering)
@@ -177,6 +193,7 @@ def top_k_matches(name_a: str, df_b: pd.DataFrame, k: int = 3) -> list[tuple[int
     """Return up to top-k matches as (row_index, score).
     If any spacing/punctuation/order-insensitive absolute match exists, ensure it is Top1 with score 1.0.
     """
+    MATCH_COUNTERS["top_k_calls"] += 1
     exact_hits = []
     fallback_scores = []
     b_names = df_b["Full Name"].fillna("")
@@ -184,7 +201,10 @@ def top_k_matches(name_a: str, df_b: pd.DataFrame, k: int = 3) -> list[tuple[int
     for i, name_b in enumerate(b_names):
         if is_absolute_name_match(name_a, name_b):
             exact_hits.append(i)
+    MATCH_COUNTERS["absolute_checks"] += len(b_names)
     if exact_hits:
+        MATCH_COUNTERS["top_k_exact_hits"] += 1
+        MATCH_COUNTERS["composite_scores"] += len(b_names) - 1
         # Prefer an exact hit that also has an email; otherwise take the first exact hit
         exact_with_email = [i for i in exact_hits if str(df_b.iloc[i].get("Email", "")).strip() != ""]
         idx = exact_with_email[0] if exact_with_email else exact_hits[0]
@@ -197,6 +217,7 @@ def top_k_matches(name_a: str, df_b: pd.DataFrame, k: int = 3) -> list[tuple[int
         fallback_scores.sort(key=lambda x: x[1], reverse=True)
         return [(idx, 1.0)] + fallback_scores[: max(0, k - 1)]
     # No absolute hit: rank by composite score
+    MATCH_COUNTERS["composite_scores"] += len(b_names)
     for i, name_b in enumerate(b_names):
         s = composite_name_score(name_a, name_b)
         fallback_scores.append((i, s))
@@ -204,12 +225,372 @@ def top_k_matches(name_a: str, df_b: pd.DataFrame, k: int = 3) -> list[tuple[int
     return fallback_scores[:k]
 
 
+# --- Precomputed roster index (accelerated path; checked against the reference by `diffcheck`) ---
+import heapq
+
+class RosterIndex:
+    """Match features for every roster row, computed once (same row order as df_b).
+
+    Holds what the per-pair helpers would otherwise recompute for every File A name:
+    normalized names, letters-only forms, token sets, initials and email presence, plus
+    hash tables that answer is_absolute_name_match for the whole roster in a few lookups.
+    """
+
+    def __init__(self, df_b: pd.DataFrame):
+        b_names = df_b["Full Name"].fillna("")
+        emails = df_b["Email"] if "Email" in df_b.columns else pd.Series([""] * len(df_b))
+        self.size = len(b_names)
+        # Same truthiness as top_k_matches: str(df_b.iloc[i].get("Email", "")).strip() != ""
+        self.has_email = [str(e).strip() != "" for e in emails]
+        self.norms: list[str] = []
+        self.flats: list[str] = []
+        self.token_lists: list[list[str]] = []
+        self.token_sets: list[set] = []
+        self.initials: list[str] = []
+        self.by_norm: Dict[str, list[int]] = {}
+        self.by_flat: Dict[str, list[int]] = {}
+        self.by_tokens: Dict[frozenset, list[int]] = {}
+        self.by_perm: Dict[str, list[int]] = {}
+        for i, name_b in enumerate(b_names):
+            self._add_row(i, normalize_name(name_b), _strip_punct_and_spaces(name_b), _tokenize(name_b))
+
+    def _add_row(self, i: int, norm: str, flat: str, tokens: list[str]) -> None:
+        from itertools import permutations
+
+        token_set = set(tokens)
+        self.norms.append(norm)
+        self.flats.append(flat)
+        self.token_lists.append(tokens)
+        self.token_sets.append(token_set)
+        self.initials.append(_initials(list(token_set)))
+        if norm:
+            self.by_norm.setdefault(norm, []).append(i)
+        self.by_flat.setdefault(flat, []).append(i)
+        self.by_tokens.setdefault(frozenset(token_set), []).append(i)
+        if 2 <= len(tokens) <= 4:  # same cap as is_absolute_name_match
+            for perm in set(permutations(tokens)):
+                self.by_perm.setdefault("".join(_strip_punct_and_spaces(t) for t in perm), []).append(i)
+
+    @staticmethod
+    def query_features(name_a: str) -> tuple:
+        """(normalized, token set, initials, letters-only) for a File A name."""
+        at = set(_tokenize(name_a))
+        return normalize_name(name_a), at, _initials(list(at)), _strip_punct_and_spaces(name_a)
+
+    def exact_hits(self, name_a: str, feats: Optional[tuple] = None) -> list[int]:
+        """Rows where is_absolute_name_match(name_a, row) is True, in roster order."""
+        na, at, _, a_flat = feats or self.query_features(name_a)
+        rows = set(self.by_flat.get(a_flat, ()))
+        if na:
+            rows.update(self.by_norm.get(na, ()))
+        rows.update(self.by_tokens.get(frozenset(at), ()))
+        rows.update(self.by_perm.get(a_flat, ()))
+        return sorted(rows)
+
+    def score(self, feats: tuple, j: int) -> float:
+        """composite_name_score(name_a, roster row j) from precomputed features."""
+        a_norm, at, ai, a_flat = feats
+        base = SequenceMatcher(None, a_norm, self.norms[j]).ratio()
+        bt = self.token_sets[j]
+        jacc = (len(at & bt) / len(at | bt)) if (at or bt) else 0.0
+        bi = self.initials[j]
+        init = 1.0 if ai and bi and ai == bi else 0.0
+        b_flat = self.flats[j]
+        flat = SequenceMatcher(None, a_flat, b_flat).ratio() if a_flat and b_flat else 0.0
+        score = 0.45*base + 0.35*jacc + 0.10*flat + 0.10*init
+        return max(0.0, min(1.0, score))
+
+def top_k_matches_indexed(name_a: str, index: RosterIndex, k: int = 3) -> list[tuple[int, float]]:
+    """Same contract and ordering as top_k_matches, using a prebuilt RosterIndex."""
+    MATCH_COUNTERS["top_k_calls"] += 1
+    feats = index.query_features(name_a)
+    exact_hits = index.exact_hits(name_a, feats)
+    MATCH_COUNTERS["absolute_checks"] += index.size
+    if exact_hits:
+        MATCH_COUNTERS["top_k_exact_hits"] += 1
+        exact_with_email = [i for i in exact_hits if index.has_email[i]]
+        idx = exact_with_email[0] if exact_with_email else exact_hits[0]
+        MATCH_COUNTERS["composite_scores"] += index.size - 1
+        # nlargest keeps roster order among ties, exactly like the stable sort in top_k_matches
+        rest = heapq.nlargest(
+            max(0, k - 1),
+            ((j, index.score(feats, j)) for j in range(index.size) if j != idx),
+            key=lambda x: x[1],
+        )
+        return [(idx, 1.0)] + rest
+    MATCH_COUNTERS["composite_scores"] += index.size
+    return heapq.nlargest(k, ((i, index.score(feats, i)) for i in range(index.size)), key=lambda x: x[1])
+
+
+# --- Trigram candidate engine (optional: needs numpy + scipy) ---
+
+def _require_scipy():
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError as e:
+        raise RuntimeError("The 'trigram' match engine needs numpy and scipy (pip install scipy).") from e
+    return np, sparse
+
+def _char_trigrams(s: str) -> list[str]:
+    padded = f"^{s}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)] if s else []
+
+class TrigramCandidateIndex:
+    """Approximate all-pairs shortlist: letters-only names (as-typed and nickname-normalized) become
+    sparse char-trigram TF-IDF vectors, and a block of File A names is compared with the whole roster
+    in one sparse matrix product. Only each name's `candidates` best cosine hits (plus any exact hits)
+    are re-ranked with the exact composite score from RosterIndex.
+    """
+
+    def __init__(self, index: RosterIndex, candidates: int = 50, block_size: int = 256):
+        np, sparse = _require_scipy()
+        self.np, self.sparse = np, sparse
+        self.index = index
+        self.n_candidates = int(candidates)
+        self.block_size = int(block_size)
+        self.vocab: Dict[str, int] = {}
+        b_forms = [(flat, norm.replace(" ", "")) for flat, norm in zip(index.flats, index.norms)]
+        B = self._vectorize(b_forms, grow=True)
+        n = max(1, B.shape[0])
+        doc_freq = np.bincount(B.indices, minlength=len(self.vocab))
+        self.idf = np.log((1.0 + n) / (1.0 + doc_freq)) + 1.0
+        self.roster_t = self._weight(B).T.tocsr()  # (vocab x roster), ready for A @ roster_t
+
+    def _vectorize(self, forms: list[tuple[str, str]], grow: bool = False):
+        np, sparse = self.np, self.sparse
+        indptr, indices, counts = [0], [], []
+        for flat, norm_flat in forms:
+            grams = Counter(_char_trigrams(flat))
+            if norm_flat != flat:
+                grams.update(_char_trigrams(norm_flat))
+            for g, c in grams.items():
+                j = self.vocab.get(g)
+                if j is None:
+                    if not grow:
+                        continue  # trigram never seen in the roster: cannot match anything
+                    j = self.vocab[g] = len(self.vocab)
+                indices.append(j)
+                counts.append(c)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(forms), len(self.vocab)),
+        )
+
+    def _weight(self, M):
+        """Sublinear TF * IDF, rows L2-normalized (so the product is cosine similarity)."""
+        np = self.np
+        M = M.copy()
+        M.data = (1.0 + np.log(M.data)) * self.idf[M.indices]
+        norms = np.sqrt(np.asarray(M.multiply(M).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return self.sparse.diags(1.0 / norms) @ M
+
+    def _shortlists(self, feats: list[tuple]) -> list:
+        np = self.np
+        forms = [(f[3], f[0].replace(" ", "")) for f in feats]
+        sims = (self._weight(self._vectorize(forms)) @ self.roster_t).tocsr()
+        out = []
+        for r in range(sims.shape[0]):
+            lo, hi = sims.indptr[r], sims.indptr[r + 1]
+            cols, vals = sims.indices[lo:hi], sims.data[lo:hi]
+            if len(cols) > self.n_candidates:
+                # Keep everything tied with the cut-off so identical roster names are never split
+                cutoff = np.partition(vals, len(vals) - self.n_candidates)[len(vals) - self.n_candidates]
+                cols = cols[vals >= cutoff]
+            out.append(cols)
+        return out
+
+    def _rerank(self, name_a: str, feats: tuple, shortlist, k: int) -> list[tuple[int, float]]:
+        ix = self.index
+        if not feats[3] or ix.size <= self.n_candidates:
+            return top_k_matches_indexed(name_a, ix, k)  # nothing to vectorize / roster small: exact scan
+        exact_hits = ix.exact_hits(name_a, feats)
+        pool = set(int(j) for j in shortlist) | set(exact_hits)
+        if len(pool) < k:
+            return top_k_matches_indexed(name_a, ix, k)  # shortlist too thin to fill Top-k
+        MATCH_COUNTERS["top_k_calls"] += 1
+        if exact_hits:
+            MATCH_COUNTERS["top_k_exact_hits"] += 1
+            exact_with_email = [i for i in exact_hits if ix.has_email[i]]
+            idx = exact_with_email[0] if exact_with_email else exact_hits[0]
+            pool.discard(idx)
+            head, n_rest = [(idx, 1.0)], max(0, k - 1)
+        else:
+            head, n_rest = [], k
+        MATCH_COUNTERS["composite_scores"] += len(pool)
+        # Scoring in roster order keeps the reference tie-break (lower roster row first)
+        scored = [(j, ix.score(feats, j)) for j in sorted(pool)]
+        return head + heapq.nlargest(n_rest, scored, key=lambda x: x[1])
+
+    def iter_top_k(self, names, k: int = 3):
+        """Yield (name, Top-k) for every name, one matrix product per block of names."""
+        names = list(names)
+        for start in range(0, len(names), self.block_size):
+            block = names[start:start + self.block_size]
+            feats = [RosterIndex.query_features(nm) for nm in block]
+            for nm, f, shortlist in zip(block, feats, self._shortlists(feats)):
+                yield nm, self._rerank(nm, f, shortlist, k)
+
+
+# Per-run matching engines: "reference" (per-pair scan), "indexed" (same results, roster
+# features precomputed), "trigram" (approximate sparse shortlist + exact re-rank).
+MATCH_ENGINES = ("reference", "indexed", "trigram")
+
+def make_matcher(df_b: pd.DataFrame, engine: str = "reference", k: int = 3, index: Optional[RosterIndex] = None):
+    """Return match_many(names) -> iterator of (name, Top-k) for the chosen engine.
+    `index` reuses an already built RosterIndex for the faster engines.
+    """
+    engine = (engine or "reference").strip().lower()
+    if engine == "reference":
+        return lambda names: ((nm, top_k_matches(nm, df_b, k=k)) for nm in names)
+    if engine not in MATCH_ENGINES:
+        raise ValueError(f"Unknown match engine '{engine}'. Use one of: {', '.join(MATCH_ENGINES)}")
+    index = index or RosterIndex(df_b)
+    if engine == "indexed":
+        return lambda names: ((nm, top_k_matches_indexed(nm, index, k)) for nm in names)
+    trigram = TrigramCandidateIndex(index)
+    return lambda names: trigram.iter_top_k(names, k)
+
+
 # ---------------------------
 # Cleaning + helpers
 # ---------------------------
 
+def _dedupe_text_key(col: pd.Series) -> pd.Series:
+    return col.astype(str).str.strip().str.lower()
+
 def dedupe_exact_file_a(df_a: pd.DataFrame) -> pd.DataFrame:
-    """Remove exact duplicates of (Name, Hours, Event)."""
+    """Remove exact duplicates of (Name, Hours, Event): name/event compared stripped and case-insensitive.
+
+    Rows are compared on three hashed key columns (no concatenated key string, no temporary column);
+    float hours are keyed on their bit pattern, which distinguishes exactly what str(hours) does.
+    """
+    import numpy as np
+
+    hours = df_a.iloc[:, 1]
+    if hours.dtype == np.float64:
+        hours_key = pd.Series(hours.to_numpy().view(np.int64), index=df_a.index)
+    else:
+        hours_key = hours.astype(str)
+    keys = pd.DataFrame({
+        "name": _dedupe_text_key(df_a.iloc[:, 0]),
+        "hours": hours_key,
+        "event": _dedupe_text_key(df_a.iloc[:, 2]),
+    })
+    out = df_a[~keys.duplicated().to_numpy()]
+    out.columns = ["FullName_A", "CreditHours", "EventName"]
+    return out
+
+def cluster_name_variants(name_counts: Dict[str, int], index: Optional[RosterIndex] = None) -> Dict[str, list[str]]:
+    """Group File A spellings of the same person: {representative: [members, representative first]}.
+
+    Names are joined when they share a normalized form (nicknames mapped), a token bag ("Smith, Michael")
+    or a letters-only form ("MichaelSmith"). A leading initial ("M. Smith") joins only when exactly one
+    cluster has a matching full first name with the same remaining tokens, and the roster `index` has exactly
+    one row with that initial and those tokens, named like that cluster (without an index, never). Spellings
+    that exactly match different roster rows (e.g. roster has both "Mike Smith" and "Michael Smith") are
+    split apart; spellings without an exact match stay with the largest split. The representative is the
+    non-initial spelling with the most File A rows (ties: alphabetical).
+    """
+    parent = {nm: nm for nm in name_counts}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a, b):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    tokens = {nm: _tokenize(nm) for nm in name_counts}
+    owner: Dict[str, str] = {}
+    for nm in sorted(name_counts):
+        toks = tokens[nm]
+        keys = [f"n:{normalize_name(nm)}", f"t:{' '.join(sorted(toks))}", f"f:{_strip_punct_and_spaces(nm)}"]
+        for key in keys:
+            if key.endswith(":"):
+                continue  # no letters: never clustered
+            if key in owner:
+                union(owner[key], nm)
+            else:
+                owner[key] = nm
+
+    def is_initial_form(nm):
+        return len(tokens[nm]) >= 2 and len(tokens[nm][0]) == 1
+
+    # "M. Smith" could be any roster M... Smith: join only when the roster has a single such person
+    roster_by_rest: Dict[tuple, list[str]] = {}
+    for toks in (index.token_lists if index is not None else []):
+        if len(toks) >= 2:
+            roster_by_rest.setdefault((toks[0][0], tuple(toks[1:])), []).append(toks[0])
+    full_by_rest: Dict[tuple, Dict[str, set]] = {}
+    for nm, toks in tokens.items():
+        if len(toks) >= 2 and len(toks[0]) > 1:
+            full_by_rest.setdefault((toks[0][0], tuple(toks[1:])), {}).setdefault(find(nm), set()).add(toks[0])
+    for nm in sorted(name_counts):
+        if is_initial_form(nm):
+            key = (tokens[nm][0], tuple(tokens[nm][1:]))
+            roots, roster_firsts = full_by_rest.get(key, {}), roster_by_rest.get(key, [])
+            if len(roots) == 1 and len(roster_firsts) == 1:
+                root, firsts = next(iter(roots.items()))
+                if roster_firsts[0] in firsts:
+                    union(root, nm)
+
+    groups: Dict[str, list[str]] = {}
+    for nm in sorted(name_counts):
+        groups.setdefault(find(nm), []).append(nm)
+    if index is not None:
+        groups = {f"{root}|{n}": part for root, members in groups.items()
+                  for n, part in enumerate(_split_by_pinned_row(members, name_counts, index))}
+    clusters = {}
+    for members in groups.values():
+        rep = min(members, key=lambda m: (is_initial_form(m), -name_counts[m], m))
+        clusters[rep] = [rep] + [m for m in members if m != rep]
+    return clusters
+
+def _split_by_pinned_row(members: list[str], name_counts: Dict[str, int], index: RosterIndex) -> list[list[str]]:
+    """Split a cluster by the roster row top_k_matches pins as Top1 for an exact match (first hit with email)."""
+    by_row: Dict[int, list[str]] = {}
+    unpinned = []
+    for nm in members:
+        hits = index.exact_hits(nm)
+        if hits:
+            with_email = [i for i in hits if index.has_email[i]]
+            by_row.setdefault(with_email[0] if with_email else hits[0], []).append(nm)
+        else:
+            unpinned.append(nm)
+    if not by_row:
+        return [members]
+    parts = sorted(by_row.values(), key=lambda part: (-sum(name_counts[m] for m in part), part[0]))
+    parts[0] = sorted(parts[0] + unpinned)
+    return parts
+
+def variant_top_k(name_a: str, tops: list[tuple[int, float]], df_b: pd.DataFrame,
+                  index: Optional[RosterIndex] = None) -> list[tuple[int, float]]:
+    """Top-k for a clustered spelling from its representative's Top-k rows, scored for this spelling the
+    way top_k_matches would: its exact roster hit (from `index`, else among those rows) as Top1 with 1.0,
+    then the rows by composite_name_score(name_a, row), highest first (ties in roster order)."""
+    b_names = df_b["Full Name"].fillna("")
+    if index is not None:
+        hits = index.exact_hits(name_a)
+        with_email = [i for i in hits if index.has_email[i]]
+    else:
+        hits = [i for i, _ in tops if is_absolute_name_match(name_a, b_names.iloc[i])]
+        with_email = [i for i in hits if str(df_b.iloc[i].get("Email", "")).strip() != ""]
+    pinned = (with_email or sorted(hits))[:1]
+    rest = sorted(
+        ((j, composite_name_score(name_a, b_names.iloc[j])) for j in sorted(i for i, _ in tops) if j not in pinned),
+        key=lambda x: x[1], reverse=True,
+    )
+    return [(i, 1.0) for i in pinned] + rest[: max(0, len(tops) - len(pinned))]
+
+def _reference_dedupe_exact_file_a(df_a: pd.DataFrame) -> pd.DataFrame:
+    """Original string-key implementation of dedupe_exact_file_a, kept for diffcheck."""
     temp = df_a.copy()
     temp.columns = ["FullName_A", "CreditHours", "EventName"]
     key = (
@@ -327,6 +708,140 @@ def apply_overrides_event_level(
     return df.drop(columns=[c for c in ["Override_FullName_B", "Override_Email"] if c in df.columns])
 
 
+def apply_decisions_event_level(
+    df_joined_events: pd.DataFrame,
+    dec: pd.DataFrame,
+    df_b: pd.DataFrame,
+) -> pd.DataFrame:
+    """Merge reviewer decisions (Decision/Pick/Chosen_Email, see load_decisions) onto event rows
+    and resolve the accepted identity for each row."""
+    df_joined_events = df_joined_events.merge(dec, on="FullName_A", how="left")
+
+    # Prepare a roster lookup by Email to enrich fields (Category, Subcategory, Country, etc.)
+    bcols = ["Full Name", "Category", "Subcategory", "Country", "CC Email", "First Conference"]
+    # Use positional column 5 (E) for Email to avoid any header/title inconsistencies
+    email_series = df_b.iloc[:, 4]
+    non_null = email_series.notna() & (email_series.astype(str).str.strip() != "")
+    b_lookup_by_email = (
+        df_b.loc[non_null].set_index(email_series[non_null])[bcols].to_dict(orient="index")  # type: ignore
+    )
+
+    # Apply decisions (ACCEPT/REJECT) with optional Chosen_Email mapped to Top candidates or Pick
+    for idx, row in df_joined_events.iterrows():
+        decision = str(row.get("Decision", "")).strip().upper()
+        chosen_email = str(row.get("Chosen_Email", "")).strip()
+        suggested_email = str(row.get("Suggested_Email", "")).strip()
+        # Resolve Pick (user can enter 1/2/3 to select TopN, or type a manual email)
+        pick_val = str(row.get("Pick", "")).strip()
+        if pick_val:
+            if pick_val in {"1", "2", "3"}:
+                if pick_val == "1" and str(row.get("Top1_Email", "")).strip():
+                    chosen_email = str(row.get("Top1_Email", "")).strip()
+                elif pick_val == "2" and str(row.get("Top2_Email", "")).strip():
+                    chosen_email = str(row.get("Top2_Email", "")).strip()
+                elif pick_val == "3" and str(row.get("Top3_Email", "")).strip():
+                    chosen_email = str(row.get("Top3_Email", "")).strip()
+            elif "@" in pick_val:
+                chosen_email = pick_val
+        # Accept if decision is ACCEPT, or if Pick is filled (unless explicitly REJECT)
+        if decision == "ACCEPT" or (decision == "" and pick_val):
+            email_to_set = chosen_email or suggested_email
+            if email_to_set:
+                # Determine the chosen candidate name from Top1/Top2/Top3 based on the selected email or Pick
+                chosen_name = ""
+                if email_to_set == str(row.get("Top1_Email", "")).strip():
+                    chosen_name = str(row.get("Top1_Name_B", "")).strip()
+                elif email_to_set == str(row.get("Top2_Email", "")).strip():
+                    chosen_name = str(row.get("Top2_Name_B", "")).strip()
+                elif email_to_set == str(row.get("Top3_Email", "")).strip():
+                    chosen_name = str(row.get("Top3_Name_B", "")).strip()
+                elif not chosen_email and not pick_val:
+                    # If using Suggested (Top1) but Top columns weren't merged (CSV), fall back
+                    chosen_name = str(row.get("Top1_Name_B", "")) or ""
+                else:
+                    # Manual email typed in Pick or Chosen_Email: look up in roster
+                    rec_manual = b_lookup_by_email.get(email_to_set)
+                    if rec_manual:
+                        chosen_name = str(rec_manual.get("Full Name", "")).strip()
+                    else:
+                        # Email not found in roster; flag for review
+                        df_joined_events.at[idx, "ReviewFlag"] = "EMAIL_NOT_IN_ROSTER"
+
+                # Set core fields
+                df_joined_events.at[idx, "Email"] = email_to_set
+                if chosen_name:
+                    df_joined_events.at[idx, "MatchedName_B"] = chosen_name
+                elif not str(row.get("MatchedName_B", "")).strip():
+                    df_joined_events.at[idx, "MatchedName_B"] = row.get("FullName_A", "")
+
+                # Enrich remaining roster fields using the selected Email
+                rec = b_lookup_by_email.get(email_to_set)
+                if rec:
+                    df_joined_events.at[idx, "Category"] = rec.get("Category", "")
+                    df_joined_events.at[idx, "Subcategory"] = rec.get("Subcategory", "")
+                    df_joined_events.at[idx, "Country"] = rec.get("Country", "")
+                    df_joined_events.at[idx, "CC Email"] = rec.get("CC Email", "")
+                    df_joined_events.at[idx, "First Conference"] = rec.get("First Conference", "")
+
+                df_joined_events.at[idx, "MatchSource"] = "USER_ACCEPTED"
+                if df_joined_events.at[idx, "ReviewFlag"] == "EMAIL_NOT_IN_ROSTER":
+                    pass
+                else:
+                    df_joined_events.at[idx, "ReviewFlag"] = ""
+        elif decision == "REJECT":
+            df_joined_events.at[idx, "Email"] = ""
+            df_joined_events.at[idx, "MatchSource"] = "USER_REJECTED"
+            df_joined_events.at[idx, "ReviewFlag"] = "REJECTED_NEEDS_EMAIL"
+
+    return df_joined_events
+
+
+def dedupe_by_email_event(df_joined_events: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Keep one row per (Email, EventName), preferring the higher MatchScore.
+    Returns (deduped_rows_with_email, removed_duplicates, rows_without_email).
+    """
+    df_with_email = df_joined_events[df_joined_events["Email"].astype(str).str.strip() != ""].copy()
+    df_without_email = df_joined_events[df_joined_events["Email"].astype(str).str.strip() == ""].copy()
+
+    # Prefer higher MatchScore for duplicates with same (Email, EventName)
+    df_with_email = df_with_email.sort_values(by=["Email", "EventName", "MatchScore"], ascending=[True, True, False])
+
+    # Mark removed duplicates (same Email+Event)
+    dup_mask = df_with_email.duplicated(subset=["Email", "EventName"], keep="first")
+    removed_dups = df_with_email[dup_mask].copy()
+    df_with_email_dedup = df_with_email[~dup_mask].copy()
+    return df_with_email_dedup, removed_dups, df_without_email
+
+def aggregate_totals_by_email(df_with_email_dedup: pd.DataFrame, df_b: pd.DataFrame) -> pd.DataFrame:
+    """Sum hours per Email and attach a display name and roster attributes."""
+    return totals_by_email(with_display_name(df_with_email_dedup, df_b))
+
+def with_display_name(df_with_email_dedup: pd.DataFrame, df_b: pd.DataFrame) -> pd.DataFrame:
+    """Add DisplayName: the roster's Full Name for the row's Email, else MatchedName_B, else FullName_A."""
+    # Pick a canonical display name per email (from collapsed File B), else fallback
+    canonical_name_map = (
+        df_b[["Email", "Full Name"]].drop_duplicates().set_index("Email")["Full Name"].to_dict()
+    )
+    return df_with_email_dedup.assign(DisplayName=(
+        df_with_email_dedup["Email"].map(canonical_name_map)
+        .fillna(df_with_email_dedup["MatchedName_B"])
+        .fillna(df_with_email_dedup["FullName_A"])
+    ))
+
+def totals_by_email(df: pd.DataFrame) -> pd.DataFrame:
+    """Sum CreditHours per Email of (Email, EventName)-deduped rows; DisplayName and roster attributes
+    come from each email's first row."""
+    totals = df.groupby(["Email"], as_index=False).agg({
+        "DisplayName": "first",
+        "Category": "first",
+        "Subcategory": "first",
+        "Country": "first",
+        "First Conference": "first",
+        "CreditHours": "sum",
+    })
+    totals["TotalCreditHours"] = totals["CreditHours"].astype(float).round(2)
+    totals = totals.drop(columns=["CreditHours"])
+    return totals
 
 # Helper: robust credit-hour parser
 from typing import Optional
@@ -357,6 +872,1197 @@ def parse_credit_hours(val) -> Optional[float]:
     except Exception:
         return None
 
+
+_CREDIT_HOURS_NUMBER = r'([-+]?\d+[.,]?\d*)'
+
+def parse_credit_hours_series(col: pd.Series) -> pd.Series:
+    """Vectorized parse_credit_hours over a column; returns float64 with NaN where not parseable.
+
+    Same results as col.apply(parse_credit_hours): int/float cells are taken as numbers, every other
+    non-empty cell goes through the same "first number" regex, run once per distinct text with str.extract.
+    """
+    import numpy as np
+
+    if pd.api.types.is_float_dtype(col.dtype) or (
+        pd.api.types.is_integer_dtype(col.dtype) and not pd.api.types.is_extension_array_dtype(col.dtype)
+    ):
+        return col.astype(np.float64)
+    if col.dtype != object:
+        # bool, datetime, categorical, extension dtypes: rare enough to go cell by cell
+        return col.apply(parse_credit_hours).astype(np.float64)
+
+    present = col.notna().to_numpy()
+    kinds = col.map(type)
+    kind_set = set(kinds[present].unique())
+    is_num = present & kinds.isin({t for t in kind_set if issubclass(t, (int, float))}).to_numpy()
+    is_str = present & kinds.isin({t for t in kind_set if issubclass(t, str)}).to_numpy()
+    is_other = present & ~is_num & ~is_str
+
+    out = np.full(len(col), np.nan)
+    if is_num.any():
+        out[is_num] = col[is_num].astype(np.float64).to_numpy()
+    text = col[is_str | is_other]
+    if is_other.any():
+        text = text.where(is_str[is_str | is_other], text.astype(str))
+    if len(text):
+        # Hours columns repeat a handful of spellings: run the regex once per distinct text
+        codes, uniques = pd.factorize(text)
+        num_txt = pd.Series(uniques, dtype=object).str.strip().str.extract(_CREDIT_HOURS_NUMBER, expand=False)
+        parsed = num_txt.str.replace(",", ".", regex=False).astype(np.float64).to_numpy()
+        out[is_str | is_other] = parsed[codes]
+    return pd.Series(out, index=col.index, name=col.name)
+
+
+# ---------------------------
+# Input loading
+# ---------------------------
+
+class InputLoadError(Exception):
+    """One or more input files could not be read. `failures` maps each file to its error."""
+
+    def __init__(self, failures: Dict[str, str]):
+        self.failures = failures
+        lines = [f"- {label}: {msg}" for label, msg in failures.items()]
+        super().__init__("Could not read input file(s):\n" + "\n".join(lines))
+
+def load_file_a(file_a: str) -> pd.DataFrame:
+    """Read File A and coerce it to (FullName_A, CreditHours, EventName)."""
+    # Files have a title in row 1; real data starts on row 2. Read with no header and skip the title row.
+    df_a_raw = pd.read_excel(file_a, header=None, skiprows=1)
+    df_a = df_a_raw.iloc[:, :3].copy()
+    df_a.columns = ["FullName_A", "CreditHours", "EventName"]
+    # Drop rows that are completely empty in those first 3 columns
+    df_a = df_a.dropna(how="all")
+    # Coerce CreditHours from mixed text (e.g., "2.0 Credit Hours") to float
+    df_a["CreditHours"] = parse_credit_hours_series(df_a["CreditHours"])
+    return df_a.dropna(subset=["FullName_A", "CreditHours"])
+
+def load_file_b(file_b: str) -> pd.DataFrame:
+    """Read File B with the 7 roster columns assigned by position."""
+    # Files have a title in row 1; real data starts on row 2. Read with no header and skip the title row.
+    df_b_raw = pd.read_excel(file_b, header=None, skiprows=1)
+    df_b_raw = df_b_raw.iloc[:, :7].copy()
+    df_b_raw.columns = ["Category", "Subcategory", "Full Name", "Country", "Email", "CC Email", "First Conference"]
+    # Hard-assert: File B always has Email in column 5 (E); reassign from position to be bulletproof
+    df_b_raw["Email"] = df_b_raw.iloc[:, 4]
+    return df_b_raw
+
+def load_roster(file_b: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Read File B and collapse it right away, so roster work starts as soon as File B is parsed."""
+    return collapse_roster_by_email(load_file_b(file_b))
+
+_DECISION_COLUMNS = ["FullName_A", "Suggested_Email", "Decision", "Chosen_Email",
+                     "Top1_Name_B", "Top1_Email", "Top2_Name_B", "Top2_Email", "Top3_Name_B", "Top3_Email", "Pick"]
+# Progressive runs (--progressive) write partial proposals here, next to proposed_matches.xlsx
+PROGRESSIVE_DIR = "partial"
+PROGRESSIVE_LIVE_CSV = "proposed_matches_live.csv"
+
+def _read_decision_sheet(dec_path: Path) -> pd.DataFrame:
+    """A decisions sheet in the standard decision columns, plus Certain and Cluster_Representative
+    ("" when the sheet has none)."""
+    if dec_path.suffix.lower() == ".xlsx":
+        dec = pd.read_excel(dec_path).fillna("")
+    else:
+        dec = pd.read_csv(dec_path).fillna("")
+    # Normalize headers
+    cmap = {c.lower().strip(): c for c in dec.columns}
+    fnc   = cmap.get("fullname_a") or "FullName_A"
+    sugg  = cmap.get("suggested_email") or "Suggested_Email"
+    deci  = cmap.get("decision") or "Decision"
+    chosen = cmap.get("chosen_email") or "Chosen_Email"
+    # Optional Top columns (may not be present in CSVs)
+    t1n = cmap.get("top1_name_b") or "Top1_Name_B"
+    t1e = cmap.get("top1_email")  or "Top1_Email"
+    t2n = cmap.get("top2_name_b") or "Top2_Name_B"
+    t2e = cmap.get("top2_email")  or "Top2_Email"
+    t3n = cmap.get("top3_name_b") or "Top3_Name_B"
+    t3e = cmap.get("top3_email")  or "Top3_Email"
+    pick = cmap.get("pick") or "Pick"
+    # Optional columns from generated proposals
+    certain = cmap.get("certain") or "Certain"
+    rep = cmap.get("cluster_representative") or "Cluster_Representative"
+
+    needed_cols = [fnc, sugg, deci, chosen, t1n, t1e, t2n, t2e, t3n, t3e, pick, certain, rep]
+    for c in needed_cols:
+        if c not in dec.columns:
+            dec[c] = ""
+    dec = dec[needed_cols].copy()
+    dec.columns = _DECISION_COLUMNS + ["Certain", "Cluster_Representative"]
+    # A Pick typed as a number in Excel reads back as 2.0; keep it as the "2" the Pick rules expect
+    dec["Pick"] = dec["Pick"].map(lambda v: str(int(v)) if isinstance(v, float) and v.is_integer() else v)
+    return dec
+
+def _reviewer_edited(dec: pd.DataFrame) -> pd.Series:
+    """Rows whose Decision/Pick/Chosen_Email differ from what the proposals were generated with
+    (Certain: ACCEPT + Pick 1, otherwise blank)."""
+    def text(col):
+        return dec[col].astype(str).str.strip()
+
+    certain = dec["Certain"].astype(str).str.strip().str.upper().isin({"TRUE", "1"})
+    decision, pick, chosen = text("Decision").str.upper(), text("Pick"), text("Chosen_Email")
+    default = (chosen == "") & (
+        (certain & (decision == "ACCEPT") & (pick == "1")) | (~certain & (decision == "") & (pick == ""))
+    )
+    return ~default
+
+def _merge_partial_decisions(dec: pd.DataFrame, dec_path: Path) -> pd.DataFrame:
+    """Fold in decisions made on a progressive run's partial files (see ProgressiveProposals).
+
+    For every name edited anywhere, the row from the most recently saved file wins, this file included.
+    """
+    partial_dir = dec_path.parent / PROGRESSIVE_DIR
+    if not partial_dir.is_dir():
+        return dec
+    parts = sorted(partial_dir.glob("proposed_matches_part_*.xlsx"))
+    if (partial_dir / PROGRESSIVE_LIVE_CSV).exists():
+        parts.append(partial_dir / PROGRESSIVE_LIVE_CSV)
+    if not parts:
+        return dec
+    sources = [(dec_path.stat().st_mtime, dec)] + [(p.stat().st_mtime, _read_decision_sheet(p)) for p in parts]
+    edits = pd.concat([frame[_reviewer_edited(frame)] for _, frame in sorted(sources, key=lambda src: src[0])])
+    if edits.empty:
+        return dec
+    edits = edits[~edits["FullName_A"].astype(str).duplicated(keep="last")]
+    kept = dec[~dec["FullName_A"].astype(str).isin(edits["FullName_A"].astype(str))]
+    print(f"Merged decisions for {len(edits):,} name(s) edited in {dec_path.name} or {PROGRESSIVE_DIR}/ files.")
+    return pd.concat([kept, edits], ignore_index=True)
+
+def _inherit_cluster_decisions(dec: pd.DataFrame) -> pd.DataFrame:
+    """Rows with no Decision/Chosen_Email/Pick of their own take the decision columns of their cluster
+    representative's row, when a reviewer edited that row. The automatic ACCEPT + Pick 1 of a Certain
+    representative is never inherited: it only says the representative's own spelling is certain."""
+    decision_cols = ["Decision", "Chosen_Email", "Pick"]
+    copy_cols = _DECISION_COLUMNS[1:]
+
+    def undecided(frame):
+        return (frame[decision_cols].astype(str).apply(lambda c: c.str.strip()) == "").all(axis=1)
+
+    key = dec["FullName_A"].astype(str)
+    rep_key = dec["Cluster_Representative"].astype(str).str.strip()
+    is_rep = key == rep_key
+    reps = dec[is_rep].set_index(key[is_rep])
+    reps = reps[~reps.index.duplicated()]
+    decided_reps = reps.index[_reviewer_edited(reps)]
+    inherit = undecided(dec) & ~is_rep & (rep_key != "") & rep_key.isin(decided_reps)
+    if inherit.any():
+        dec = dec.copy()
+        dec[copy_cols] = dec[copy_cols].astype(object)
+        dec.loc[inherit, copy_cols] = reps.loc[rep_key[inherit], copy_cols].to_numpy()
+    return dec
+
+def load_decisions(decisions_path: Optional[str]) -> Optional[pd.DataFrame]:
+    """Read a decisions file (proposed_matches.xlsx or CSV) into the standard decision columns.
+    Decisions made on partial files of a progressive run next to it are merged in, and clustered
+    variants left blank follow their representative's reviewed decision. Returns None when no path is given or the file does not exist.
+    """
+    if not decisions_path:
+        return None
+    dec_path = Path(decisions_path)
+    if not dec_path.exists():
+        return None
+    dec = _merge_partial_decisions(_read_decision_sheet(dec_path), dec_path)
+    # Clustered proposals (--cluster_names): variants the reviewer left blank follow a reviewed representative
+    if (dec["Cluster_Representative"].astype(str).str.strip() != "").any():
+        dec = _inherit_cluster_decisions(dec)
+    return dec[_DECISION_COLUMNS].copy()
+
+def load_inputs(
+    file_a: str,
+    file_b: str,
+    decisions_path: Optional[str] = None,
+    overrides_csv: Optional[str] = None,
+    max_workers: int = 4,
+    cache: Optional["InputCache"] = None,
+) -> Dict[str, object]:
+    """Read File A, File B (+ roster collapse), decisions and overrides concurrently.
+
+    The reads are independent, so on network shares their latency overlaps instead of adding up.
+    File B may be a roster index file (build-index). Returns {"df_a", "roster", "decisions", "overrides",
+    "roster_index"}; "roster" is (df_b, email_collisions) and "roster_index" is the RosterIndex from the
+    index file or from `cache`, or None.
+    Every file that fails is reported together in a single InputLoadError.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def preloaded(kind, fn):
+        # Reuse a preload of the same file (path, size and mtime unchanged), otherwise read it now
+        def load(path):
+            hit = cache.get(kind, path) if cache is not None else None
+            return fn(path) if hit is None else hit
+        return load
+
+    jobs = {
+        "df_a": ("File A", file_a, preloaded("df_a", load_file_a)),
+        "roster": ("File B", file_b, preloaded("roster", load_roster_source)),
+        "decisions": ("Decisions file", decisions_path, load_decisions),
+        "overrides": ("Overrides CSV", overrides_csv, load_overrides),
+    }
+    results: Dict[str, object] = {"decisions": None, "overrides": None, "roster_index": None}
+    failures: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="load") as pool:
+        futures = {key: pool.submit(fn, path) for key, (_, path, fn) in jobs.items() if path}
+        for key, fut in futures.items():
+            label, path, _ = jobs[key]
+            try:
+                results[key] = fut.result()
+            except Exception as e:
+                failures[f"{label} ({path})"] = f"{type(e).__name__}: {e}"
+    if failures:
+        raise InputLoadError(failures)
+    df_b, email_collisions, results["roster_index"] = results["roster"]
+    results["roster"] = (df_b, email_collisions)
+    return results
+
+class InputCache:
+    """Background preloads of File A and the roster (collapsed, plus its RosterIndex on request), one per input.
+
+    The GUI starts a preload as soon as a file is picked; load_inputs reuses it, waiting if it is still
+    running. Entries are keyed by path, size and mtime, so an edited or replaced file is read again.
+    A failed preload is ignored here; the normal read reports the error.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preload")
+        self._lock = threading.Lock()
+        self._entries: Dict[str, tuple] = {}
+
+    @staticmethod
+    def file_key(path: str) -> tuple:
+        p = Path(path).expanduser().resolve()
+        st = p.stat()
+        return (str(p), st.st_size, st.st_mtime_ns)
+
+    @staticmethod
+    def _load(kind: str, path: str, build_index: bool):
+        if kind == "df_a":
+            return load_file_a(path)
+        df_b, email_collisions, index = load_roster_source(path)
+        return df_b, email_collisions, index or (RosterIndex(df_b) if build_index else None)
+
+    @staticmethod
+    def _add_index(loaded):
+        df_b, email_collisions, index = loaded.result()
+        return df_b, email_collisions, index or RosterIndex(df_b)
+
+    def preload(self, kind: str, path: str, on_done=None, build_index: bool = False):
+        """Start loading `path` as "df_a" or "roster" unless that exact file is already loaded or loading.
+        build_index: also build the roster's RosterIndex (used by the indexed/trigram engines, clustering
+        and progressive runs; the reference engine does not need it). A roster already loaded without one
+        gets it added. `on_done(future)` is called from the worker thread when it finishes.
+        Returns the future, or None."""
+        try:
+            key = self.file_key(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(kind)
+            if entry is None or entry[0] != key:
+                entry = (key, self._pool.submit(self._load, kind, path, build_index), build_index)
+                self._entries[kind] = entry
+            elif build_index and not entry[2]:
+                entry = (key, self._pool.submit(self._add_index, entry[1]), True)
+                self._entries[kind] = entry
+        if on_done:
+            entry[1].add_done_callback(on_done)
+        return entry[1]
+
+    def get(self, kind: str, path: str):
+        """Preloaded result for `path` (File A frame, or (df_b, email_collisions, index)); None if absent, stale or failed."""
+        try:
+            key = self.file_key(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(kind)
+        if entry is None or entry[0] != key:
+            return None
+        try:
+            return entry[1].result()
+        except Exception:
+            return None
+
+
+# ---------------------------
+# Roster index file (build-index)
+# ---------------------------
+
+# Layout: magic | uint32 format version | uint32 header length | JSON header | sections (64-byte aligned).
+# Sections are flat little-endian arrays that are memory-mapped on open, so processes opening the same
+# file share its pages. Strings are stored as an ASCII/UTF-8 blob plus int64 offsets; each exact-match
+# table is sorted 64-bit key hashes (blake2b) + int64 starts + int32 roster rows. The roster frames are a
+# JSON section (plain values only, so opening a file never runs code from it).
+ROSTER_INDEX_MAGIC = b"PDHRIDX\n"
+ROSTER_INDEX_VERSION = 2
+ROSTER_INDEX_SUFFIX = ".pdhidx"
+_INDEX_ALIGN = 64
+_INDEX_TABLES = ("norm", "flat", "tokens", "perm")
+
+def _index_features_fingerprint() -> str:
+    """Changes whenever the stored features would be computed differently (format version, nickname map)."""
+    import hashlib
+
+    payload = json.dumps({"version": ROSTER_INDEX_VERSION, "nick_map": sorted(_NICK_MAP.items())})
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+def _index_key_hash(key: str) -> int:
+    import hashlib
+
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+def _index_token_key(tokens) -> str:
+    return "\x1f".join(sorted(tokens))
+
+def _file_digest(path) -> str:
+    import hashlib
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _pack_strings(strings: list) -> tuple:
+    import numpy as np
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.int64) if encoded else []
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def _unpack_strings(blob, offsets) -> list[str]:
+    data = blob.tobytes().decode("utf-8")
+    if data.isascii():
+        return [data[a:b] for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+    raw = blob.tobytes()
+    return [raw[a:b].decode("utf-8") for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+def _json_cell(v):
+    """A frame cell as a JSON value; dates are tagged so they come back as Timestamps."""
+    if v is None or isinstance(v, (bool, str)):
+        return v
+    if isinstance(v, (int, float)):
+        return v
+    if hasattr(v, "item") and not isinstance(v, pd.Timestamp):
+        return _json_cell(v.item())  # numpy scalar
+    if v is pd.NaT:
+        return {"$nat": True}
+    if isinstance(v, pd.Timestamp) or hasattr(v, "isoformat"):
+        return {"$datetime": pd.Timestamp(v).isoformat()}
+    return {"$str": str(v)}
+
+def _from_json_cell(v):
+    if isinstance(v, dict):
+        if "$datetime" in v:
+            return pd.Timestamp(v["$datetime"])
+        if "$nat" in v:
+            return pd.NaT
+        return v.get("$str", "")
+    return v
+
+def _frame_to_json(df: pd.DataFrame) -> dict:
+    """Columns, dtypes, index and cell values of a frame as plain JSON data."""
+    return {
+        "columns": [str(c) for c in df.columns],
+        "dtypes": [str(t) for t in df.dtypes],
+        "index": [_json_cell(v) for v in df.index.tolist()],
+        "index_dtype": str(df.index.dtype),
+        "data": [[_json_cell(v) for v in df[c].tolist()] for c in df.columns],
+    }
+
+def _frame_from_json(obj: dict) -> pd.DataFrame:
+    def series(values, dtype):
+        values = [_from_json_cell(v) for v in values]
+        return pd.Series(values, dtype=object if dtype == "object" else dtype)
+
+    index = pd.Index(series(obj["index"], obj["index_dtype"]))
+    if obj["index"] == list(range(len(obj["index"]))) and obj["index_dtype"] == "int64":
+        index = pd.RangeIndex(len(obj["index"]))
+    return pd.DataFrame(
+        {c: series(values, dtype).to_numpy() for c, dtype, values in zip(obj["columns"], obj["dtypes"], obj["data"])},
+        index=index, columns=obj["columns"],
+    )
+
+def _pack_table(mapping: Dict[str, list]) -> tuple:
+    """Hash table as (sorted uint64 key hashes, int64 starts, int32 rows); rows keep roster order per key."""
+    import numpy as np
+
+    entries = sorted((_index_key_hash(key), rows) for key, rows in mapping.items())
+    hashes = np.array([h for h, _ in entries], dtype=np.uint64)
+    if len(hashes) > 1 and (hashes[1:] == hashes[:-1]).any():
+        raise ValueError("Roster index key hash collision; cannot build an index for this roster.")
+    starts = np.zeros(len(entries) + 1, dtype=np.int64)
+    starts[1:] = np.cumsum([len(rows) for _, rows in entries], dtype=np.int64) if entries else []
+    rows = np.array([r for _, rs in entries for r in rs], dtype=np.int32)
+    return hashes, starts, rows
+
+def _perm_keys(tokens: list[str]) -> set:
+    from itertools import permutations
+
+    if not 2 <= len(tokens) <= 4:  # same cap as is_absolute_name_match
+        return set()
+    return {"".join(_strip_punct_and_spaces(t) for t in perm) for perm in permutations(tokens)}
+
+class MappedRosterIndex(RosterIndex):
+    """RosterIndex opened from a build-index file.
+
+    Only the exact-match tables and the email flags are used straight from the mapped pages (shared by
+    every process that opens the file). Each per-row column (norms, flats, tokens) is decoded into this process the first time it is used; scoring reads every row, so once
+    a name is scored those columns cost as much memory as in RosterIndex.
+    `warnings` holds messages for the user, e.g. that File B changed after the index was built.
+    """
+
+    def __init__(self, sections: Dict[str, object]):
+        self._sections = sections
+        self.has_email = sections["has_email"].view(bool)
+        self.size = len(self.has_email)
+        self.warnings: list[str] = []
+
+    def _strings(self, name: str) -> list[str]:
+        return _unpack_strings(self._sections[f"{name}.blob"], self._sections[f"{name}.offsets"])
+
+    @cached_property
+    def norms(self) -> list[str]:
+        return self._strings("norms")
+
+    @cached_property
+    def flats(self) -> list[str]:
+        return self._strings("flats")
+
+    @cached_property
+    def token_lists(self) -> list[list[str]]:
+        vocab = self._strings("vocab")
+        ids = self._sections["tokens.ids"].tolist()
+        offs = self._sections["tokens.offsets"].tolist()
+        return [[vocab[t] for t in ids[offs[i]:offs[i + 1]]] for i in range(self.size)]
+
+    @cached_property
+    def token_sets(self) -> list[set]:
+        return [set(tokens) for tokens in self.token_lists]
+
+    @cached_property
+    def initials(self) -> list[str]:
+        # Initials depend on set iteration order, so they are recomputed exactly as RosterIndex does
+        return [_initials(list(token_set)) for token_set in self.token_sets]
+
+    def _lookup(self, table: str, key: str) -> list[int]:
+        import numpy as np
+
+        hashes = self._sections[f"{table}.keys"]
+        h = np.uint64(_index_key_hash(key))
+        pos = int(np.searchsorted(hashes, h))
+        if pos == len(hashes) or hashes[pos] != h:
+            return []
+        starts = self._sections[f"{table}.starts"]
+        return self._sections[f"{table}.rows"][starts[pos]:starts[pos + 1]].tolist()
+
+    def exact_hits(self, name_a: str, feats: Optional[tuple] = None) -> list[int]:
+        # Each hit is re-checked against the row itself, so a 64-bit hash collision can never add a row
+        na, at, _, a_flat = feats or self.query_features(name_a)
+        rows = {j for j in self._lookup("flat", a_flat) if self.flats[j] == a_flat}
+        if na:
+            rows.update(j for j in self._lookup("norm", na) if self.norms[j] == na)
+        rows.update(j for j in self._lookup("tokens", _index_token_key(at)) if self.token_sets[j] == at)
+        rows.update(j for j in self._lookup("perm", a_flat) if a_flat in _perm_keys(self.token_lists[j]))
+        return sorted(rows)
+
+def write_roster_index(df_b: pd.DataFrame, email_collisions: pd.DataFrame, out_path, source: Optional[str] = None) -> Path:
+    """Serialize the collapsed roster and its RosterIndex features to a roster index file."""
+    import numpy as np
+    import struct
+
+    index = RosterIndex(df_b)
+    vocab = sorted({t for tokens in index.token_lists for t in tokens})
+    vocab_ids = {t: i for i, t in enumerate(vocab)}
+    token_offsets = np.zeros(index.size + 1, dtype=np.int64)
+    token_offsets[1:] = np.cumsum([len(tokens) for tokens in index.token_lists], dtype=np.int64) if index.size else []
+
+    sections = {"has_email": np.array(index.has_email, dtype=np.uint8)}
+    for name, strings in (("norms", index.norms), ("flats", index.flats), ("vocab", vocab)):
+        sections[f"{name}.blob"], sections[f"{name}.offsets"] = _pack_strings(strings)
+    sections["tokens.ids"] = np.array([vocab_ids[t] for tokens in index.token_lists for t in tokens], dtype=np.int32)
+    sections["tokens.offsets"] = token_offsets
+    tables = {
+        "norm": index.by_norm,
+        "flat": index.by_flat,
+        "tokens": {_index_token_key(k): v for k, v in index.by_tokens.items()},
+        "perm": index.by_perm,
+    }
+    for name in _INDEX_TABLES:
+        sections[f"{name}.keys"], sections[f"{name}.starts"], sections[f"{name}.rows"] = _pack_table(tables[name])
+    frames = {"roster": _frame_to_json(df_b), "email_collisions": _frame_to_json(email_collisions)}
+    sections["roster.json"] = np.frombuffer(json.dumps(frames).encode("utf-8"), dtype=np.uint8)
+
+    layout, offset = {}, 0
+    for name, arr in sections.items():
+        layout[name] = {"offset": offset, "dtype": arr.dtype.str, "count": int(arr.size)}
+        offset += -(-arr.nbytes // _INDEX_ALIGN) * _INDEX_ALIGN
+    header = {
+        "format_version": ROSTER_INDEX_VERSION,
+        "features": _index_features_fingerprint(),
+        "rows": index.size,
+        "built": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "source": None,
+        "sections": layout,
+    }
+    if source:
+        src = Path(source).resolve()
+        st = src.stat()
+        header["source"] = {"path": str(src), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "blake2b": _file_digest(src)}
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = -(-(16 + len(header_bytes)) // _INDEX_ALIGN) * _INDEX_ALIGN
+
+    out_path = Path(out_path)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(ROSTER_INDEX_MAGIC + struct.pack("<II", ROSTER_INDEX_VERSION, len(header_bytes)) + header_bytes)
+        for name, arr in sections.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(arr.astype(arr.dtype.newbyteorder("<"), copy=False).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+def build_roster_index_file(file_b: str, out_path: Optional[str] = None) -> Path:
+    """Read and collapse File B, then write its roster index (default: next to File B, .pdhidx)."""
+    df_b, email_collisions = load_roster(file_b)
+    return write_roster_index(df_b, email_collisions, out_path or Path(file_b).with_suffix(ROSTER_INDEX_SUFFIX), source=file_b)
+
+def is_roster_index_file(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(ROSTER_INDEX_MAGIC)) == ROSTER_INDEX_MAGIC
+    except OSError:
+        return False
+
+def open_roster_index(path: str) -> Tuple[pd.DataFrame, pd.DataFrame, MappedRosterIndex]:
+    """Map a roster index file. Returns (df_b, email_collisions, index), as if File B had been read and indexed."""
+    import mmap
+    import numpy as np
+    import struct
+
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(ROSTER_INDEX_MAGIC)] != ROSTER_INDEX_MAGIC:
+        raise ValueError(f"{path} is not a roster index file (build one with: run_me_nocerts.py build-index)")
+    version, header_len = struct.unpack_from("<II", mm, len(ROSTER_INDEX_MAGIC))
+    if version != ROSTER_INDEX_VERSION:
+        raise ValueError(f"{path} uses index format {version}; this version reads format {ROSTER_INDEX_VERSION}. Rebuild it with build-index.")
+    header = json.loads(mm[16:16 + header_len].decode("utf-8"))
+    if header["features"] != _index_features_fingerprint():
+        raise ValueError(f"{path} was built with different name normalization (e.g. nickname map). Rebuild it with build-index.")
+    data_start = -(-(16 + header_len) // _INDEX_ALIGN) * _INDEX_ALIGN
+    sections = {
+        name: np.frombuffer(mm, dtype=np.dtype(meta["dtype"]), count=meta["count"], offset=data_start + meta["offset"])
+        for name, meta in header["sections"].items()
+    }
+
+    frames = json.loads(sections.pop("roster.json").tobytes().decode("utf-8"))
+    df_b, email_collisions = _frame_from_json(frames["roster"]), _frame_from_json(frames["email_collisions"])
+    index = MappedRosterIndex(sections)
+
+    # Reported by the run (CLI output, or a warning dialog in the app), not printed from a loader thread
+    source = header.get("source")
+    if source and Path(source["path"]).exists():
+        st = Path(source["path"]).stat()
+        changed = (st.st_size, st.st_mtime_ns) != (source["size"], source["mtime_ns"])
+        if changed and _file_digest(source["path"]) != source["blake2b"]:
+            index.warnings.append(f"{source['path']} changed after {path} was built ({header['built']}); "
+                                  f"rebuild the index to use the current roster.")
+    return df_b, email_collisions, index
+
+def load_roster_source(path: str) -> Tuple[pd.DataFrame, pd.DataFrame, Optional[RosterIndex]]:
+    """File B as (df_b, email_collisions, index): a roster index file is mapped, an Excel roster is read
+    and collapsed (index None)."""
+    if is_roster_index_file(path):
+        return open_roster_index(path)
+    df_b, email_collisions = load_roster(path)
+    return df_b, email_collisions, None
+
+def cmd_build_index(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="run_me_nocerts.py build-index",
+        description="Precompute File B's collapsed roster and match structures into a roster index file. "
+                    "Pass the index file as --file_b (or File B in the app) to skip re-reading the roster.",
+    )
+    parser.add_argument("--file_b", required=True, help="Path to File B (roster Excel)")
+    parser.add_argument("--out", required=False, help=f"Index file to write (default: File B path with {ROSTER_INDEX_SUFFIX})")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    out = build_roster_index_file(args.file_b, args.out)
+    build_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    df_b, _, _ = open_roster_index(str(out))
+    open_s = time.perf_counter() - t0
+    size_mb = out.stat().st_size / 1e6
+    print(f"Roster index: {out.resolve()} ({len(df_b):,} people, {size_mb:.1f} MB)")
+    print(f"Built in {build_s:.2f}s; opens in {open_s:.2f}s.")
+    return 0
+
+
+# ---------------------------
+# Profiling (--profile)
+# ---------------------------
+
+class _StackSampler(threading.Thread):
+    """Sample Python stacks at a fixed interval and count them in collapsed-stack form
+    ("thread;outer;...;inner count"), the input format of flamegraph.pl / speedscope.
+    Samples the thread that started profiling plus any thread started afterwards (loaders, writers).
+    """
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._target = threading.get_ident()
+        self._preexisting = {t.ident for t in threading.enumerate()} - {self._target}
+        self._stop_evt = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._stop_evt.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me or tid in self._preexisting:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(tid, f"thread-{tid}"))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_evt.set()
+        self.join()
+
+def _match_counter_report(elapsed: float) -> Dict[str, float]:
+    c = dict(MATCH_COUNTERS)
+    calls = c["top_k_calls"]
+    checks = c["absolute_checks"]
+    c["pairwise_comparisons"] = checks + c["composite_scores"]
+    c["exact_hit_rate"] = round(c["top_k_exact_hits"] / calls, 4) if calls else 0.0
+    c["permutation_attempts_per_check"] = round(c["permutation_attempts"] / checks, 4) if checks else 0.0
+    c["elapsed_seconds"] = round(elapsed, 3)
+    return c
+
+@contextmanager
+def profile_run(out_path: Path):
+    """Profile everything inside the block and write, next to the outputs:
+    profile.pstats (cProfile), profile_top.txt (cumulative top functions),
+    profile.collapsed (sampled stacks for flamegraphs) and profile_counters.json
+    (pairwise comparisons, permutation attempts, exact-hit rate).
+    """
+    import cProfile
+    import pstats
+
+    global _token_orders
+    plain_orders = _token_orders
+
+    def counted_orders(tokens):
+        for order in plain_orders(tokens):
+            MATCH_COUNTERS["permutation_attempts"] += 1
+            yield order
+
+    reset_match_counters()
+    _token_orders = counted_orders
+    prof = cProfile.Profile()
+    sampler = _StackSampler()
+    sampler.start()
+    t0 = time.perf_counter()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        sampler.stop()
+        _token_orders = plain_orders
+        elapsed = time.perf_counter() - t0
+        out_path.mkdir(parents=True, exist_ok=True)
+        prof.dump_stats(str(out_path / "profile.pstats"))
+        with open(out_path / "profile_top.txt", "w") as fh:
+            pstats.Stats(prof, stream=fh).sort_stats("cumulative").print_stats(60)
+        with open(out_path / "profile.collapsed", "w") as fh:
+            for stack, n in sorted(sampler.counts.items()):
+                fh.write(f"{stack} {n}\n")
+        report = _match_counter_report(elapsed)
+        with open(out_path / "profile_counters.json", "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(
+            f"Profile: {report['elapsed_seconds']}s, {report['pairwise_comparisons']} pairwise comparisons, "
+            f"{report['permutation_attempts']} permutation attempts, exact-hit rate {report['exact_hit_rate']:.1%}. "
+            f"Files in: {out_path.resolve()}"
+        )
+
+
+# ---------------------------
+# Category filter + partitioned export
+# ---------------------------
+
+# Partition modes -> roster columns that define one output folder
+PARTITION_MODES = {
+    "category": ["Category"],
+    "subcategory": ["Category", "Subcategory"],
+}
+
+def parse_category_list(category_filter: Optional[str]) -> list[str]:
+    """Split a Category filter like 'User, Speaker' into lowercased names.
+    A single value (e.g. 'User') behaves exactly like the old one-category filter.
+    """
+    if not category_filter:
+        return []
+    return [c.strip().lower() for c in str(category_filter).split(",") if c.strip()]
+
+def _safe_dirname(val) -> str:
+    s = "" if pd.isna(val) else str(val).strip()
+    s = re.sub(r'[\\/:*?"<>|]+', "_", s).strip(" .")
+    return s or "Uncategorized"
+
+def write_partitioned_master_lists(
+    totals: pd.DataFrame,
+    out_path: Path,
+    partition_by: str,
+    master_cols: list[str],
+) -> pd.DataFrame:
+    """Write one master_list.xlsx/.csv per Category (or Category/Subcategory) from
+    already-aggregated totals, so all partitions come out of a single run.
+    Returns a summary table (one row per partition) that is also saved next to the folders.
+    """
+    mode = str(partition_by).strip().lower()
+    keys = PARTITION_MODES.get(mode)
+    if not keys:
+        raise ValueError(f"Unknown partition mode '{partition_by}'. Use one of: {', '.join(PARTITION_MODES)}")
+
+    base = out_path / f"master_lists_by_{mode}"
+    base.mkdir(parents=True, exist_ok=True)
+
+    # Group case-insensitively (like the Category filter) so ' User' and 'user' land in the same folder;
+    # the folder and summary use the first spelling seen in the data
+    labels = [totals[k].fillna("").astype(str).str.strip() for k in keys]
+    group_keys = [lab.str.casefold() for lab in labels]
+    # Folder names are unique per parent ignoring case, so labels that only differ in
+    # characters _safe_dirname replaces get a " (2)" suffix instead of overwriting each other
+    folder_names: dict[tuple, str] = {}
+    taken: dict[tuple, set[str]] = {}
+    summary_rows = []
+    for _, part in totals.groupby(group_keys, sort=True):
+        group_vals = tuple(part[k].fillna("").astype(str).str.strip().iloc[0] for k in keys)
+        parts = []
+        for depth in range(len(keys)):
+            node = tuple(v.casefold() for v in group_vals[:depth + 1])
+            if node not in folder_names:
+                used = taken.setdefault(node[:-1], set())
+                name = _safe_dirname(group_vals[depth])
+                candidate, n = name, 1
+                while candidate.casefold() in used:
+                    n += 1
+                    candidate = f"{name} ({n})"
+                used.add(candidate.casefold())
+                folder_names[node] = candidate
+            parts.append(folder_names[node])
+        folder = base.joinpath(*parts)
+        folder.mkdir(parents=True, exist_ok=True)
+        part[master_cols].to_excel(folder / "master_list.xlsx", index=False)
+        part[master_cols].to_csv(folder / "master_list.csv", index=False)
+        entry = {k: (v or "(blank)") for k, v in zip(keys, group_vals)}
+        entry["People"] = int(len(part))
+        entry["TotalCreditHours"] = round(float(part["TotalCreditHours"].sum()), 2)
+        entry["Folder"] = str(folder.relative_to(out_path))
+        summary_rows.append(entry)
+
+    summary = pd.DataFrame(summary_rows, columns=keys + ["People", "TotalCreditHours", "Folder"])
+    summary.to_excel(base / "partition_summary.xlsx", index=False)
+    return summary
+
+def build_proposal_entry(nm: str, tops: list[tuple[int, float]], df_b: pd.DataFrame) -> dict:
+    """One proposed_matches row for a File A name from its Top-k matches."""
+    entry = {"FullName_A": nm}
+    if tops:
+        idx1, sc1 = tops[0]
+        br1 = df_b.iloc[idx1]
+        entry["Top1_Name_B"] = br1.get("Full Name", "")
+        entry["Top1_Email"] = br1.get("Email", "")
+        entry["Top1_Score"] = round(float(sc1), 3)
+        # Decide "Certain" only when exact letters-only equality (spacing/punctuation-insensitive) with email present
+        is_certain = (entry.get("Top1_Score", 0.0) == 1.0) and is_spacing_punct_equal(nm, entry["Top1_Name_B"]) and bool(entry["Top1_Email"])
+        entry["Certain"] = bool(is_certain)
+
+        # Include Top2/Top3 only if NOT certain (to reduce clutter)
+        if not is_certain and len(tops) > 1:
+            idx2, sc2 = tops[1]
+            br2 = df_b.iloc[idx2]
+            entry["Top2_Name_B"] = br2.get("Full Name", "")
+            entry["Top2_Email"] = br2.get("Email", "")
+            entry["Top2_Score"] = round(float(sc2), 3)
+        else:
+            entry["Top2_Name_B"], entry["Top2_Email"], entry["Top2_Score"] = "", "", ""
+        if not is_certain and len(tops) > 2:
+            idx3, sc3 = tops[2]
+            br3 = df_b.iloc[idx3]
+            entry["Top3_Name_B"] = br3.get("Full Name", "")
+            entry["Top3_Email"] = br3.get("Email", "")
+            entry["Top3_Score"] = round(float(sc3), 3)
+        else:
+            entry["Top3_Name_B"], entry["Top3_Email"], entry["Top3_Score"] = "", "", ""
+
+        # Suggested + decision fields
+        entry["Suggested_Email"] = entry.get("Top1_Email", "")
+        # Auto-accept only when Certain; otherwise leave blank for human review
+        entry["Decision"] = "ACCEPT" if is_certain else ""
+        entry["Chosen_Email"] = ""
+        # New: allow user to enter 1/2/3 or a manual email in the proposals sheet
+        entry["Pick"] = "1" if is_certain else ""
+    else:
+        # No candidates — force review
+        entry.update({
+            "Top1_Name_B": "", "Top1_Email": "", "Top1_Score": "",
+            "Top2_Name_B": "", "Top2_Email": "", "Top2_Score": "",
+            "Top3_Name_B": "", "Top3_Email": "", "Top3_Score": "",
+            "Certain": False, "Suggested_Email": "", "Decision": "", "Chosen_Email": "", "Pick": ""
+        })
+    return entry
+
+def write_proposals_workbook(proposals_df: pd.DataFrame, pm_path: Path) -> None:
+    """Write proposed_matches.xlsx with Certain rows highlighted green."""
+    # Write ONE Excel (no conditional formatting for auto-certain rows)
+    from openpyxl import Workbook
+    from openpyxl.utils.dataframe import dataframe_to_rows
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Proposed Matches"
+
+    for r in dataframe_to_rows(proposals_df, index=False, header=True):
+        ws.append(r)
+
+    # Green highlight for rows where Certain == TRUE
+    from openpyxl.styles import PatternFill
+    from openpyxl.formatting.rule import FormulaRule
+
+    header = [cell.value for cell in ws[1]]
+    if "Certain" in header:
+        certain_col_idx = header.index("Certain") + 1
+        last_row = ws.max_row
+        last_col_letter = ws.cell(row=1, column=ws.max_column).column_letter
+        certain_col_letter = ws.cell(row=1, column=certain_col_idx).column_letter
+        green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
+        rule = FormulaRule(formula=[f"${certain_col_letter}2=TRUE"], stopIfTrue=False, fill=green_fill)
+        ws.conditional_formatting.add(f"A2:{last_col_letter}{last_row}", rule)
+
+    wb.save(pm_path)
+
+def build_joined_event_row(name_a, hours: float, event, tops: list[tuple[int, float]], df_b: pd.DataFrame) -> dict:
+    """Event-level join for one File A row from its name's Top-k (only Top1 is used)."""
+    if not tops:
+        return {
+            "FullName_A": name_a,
+            "EventName": event,
+            "CreditHours": hours,
+            "MatchedName_B": "",
+            "Email": "",
+            "Category": "",
+            "Subcategory": "",
+            "Country": "",
+            "CC Email": "",
+            "First Conference": "",
+            "MatchScore": 0.0,
+            "MatchSource": "FUZZY_NO_MATCH",
+            "ReviewFlag": "NO_MATCH_OR_LOW_SCORE",
+            "Confidence": 0.0,
+            "AssumedEmail": "",
+            "AssumedName": "",
+        }
+    idx, score = tops[0]
+    match_row = df_b.iloc[idx]
+    return {
+        "FullName_A": name_a,
+        "EventName": event,
+        "CreditHours": hours,
+        "MatchedName_B": match_row["Full Name"],
+        "Email": match_row["Email"],
+        "Category": match_row["Category"],
+        "Subcategory": match_row["Subcategory"],
+        "Country": match_row["Country"],
+        "CC Email": match_row["CC Email"],
+        "First Conference": match_row["First Conference"],
+        "MatchScore": round(float(score), 3),
+        "MatchSource": "FUZZY_NAME",
+        "ReviewFlag": "",
+        "Confidence": round(float(score), 3),
+        "AssumedEmail": match_row["Email"],
+        "AssumedName": match_row["Full Name"],
+    }
+
+
+# ---------------------------
+# Pipelined execution (stage timing, background writer)
+# ---------------------------
+
+class StageTimer:
+    """Records when each pipeline stage started/ended (seconds from run start) and on which thread,
+    so overlapping stages are visible in the printed table and stage_timings.csv."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.rows: list[dict] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.rows.append({
+                    "Stage": name,
+                    "Thread": threading.current_thread().name,
+                    "Start_s": round(start - self.t0, 3),
+                    "End_s": round(end - self.t0, 3),
+                    "Duration_s": round(end - start, 3),
+                })
+
+    def report(self, out_path: Optional[Path] = None) -> pd.DataFrame:
+        df = pd.DataFrame(self.rows, columns=["Stage", "Thread", "Start_s", "End_s", "Duration_s"]).sort_values("Start_s")
+        print("Stage timings (seconds from start):")
+        for r in df.itertuples(index=False):
+            print(f"  {r.Stage:<48} {r.Start_s:8.2f} -> {r.End_s:8.2f}  ({r.Duration_s:.2f}s, {r.Thread})")
+        print(f"  total wall time {time.perf_counter() - self.t0:.2f}s")
+        if out_path is not None:
+            df.to_csv(out_path / "stage_timings.csv", index=False)
+        return df
+
+class BackgroundWriter:
+    """Writes output files on a 'writer' thread fed by a bounded queue, so CPU-bound stages
+    don't wait on disk. Jobs run in submission order; wait(label) blocks until that job is done and
+    close() drains the queue. Both re-raise the first write error.
+    Callers must hand over DataFrames they will not mutate afterwards (pass a copy otherwise).
+    """
+
+    def __init__(self, timer: StageTimer, max_pending: int = 8):
+        import queue
+
+        self.timer = timer
+        self._q = queue.Queue(maxsize=max_pending)
+        self._done: Dict[str, threading.Event] = {}
+        self._errors: list[BaseException] = []
+        self._thread = threading.Thread(target=self._run, name="writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, label: str, fn, *args, **kwargs) -> None:
+        done = threading.Event()
+        self._done[label] = done
+        self._q.put((label, fn, args, kwargs, done))
+
+    def _run(self):
+        while True:
+            job = self._q.get()
+            if job is None:
+                return
+            label, fn, args, kwargs, done = job
+            try:
+                with self.timer.stage(f"write {label}"):
+                    fn(*args, **kwargs)
+            except BaseException as e:
+                self._errors.append(e)
+            finally:
+                done.set()
+
+    def _raise_first_error(self):
+        if self._errors:
+            raise self._errors[0]
+
+    def wait(self, label: str) -> None:
+        done = self._done.get(label)
+        if done is not None:
+            done.wait()
+        self._raise_first_error()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._q.put(None)
+            self._thread.join()
+        self._raise_first_error()
+
+def sort_proposals(proposals_df: pd.DataFrame, cluster_names: bool = False) -> pd.DataFrame:
+    """Order proposals so items needing attention appear first and greens last."""
+    if cluster_names:
+        # Whole clusters move together (representative first), placed by their representative's row
+        rep_rows = proposals_df[proposals_df["FullName_A"] == proposals_df["Cluster_Representative"]].set_index("FullName_A")
+        proposals_df = proposals_df.assign(
+            _certain=proposals_df["Cluster_Representative"].map(rep_rows["Certain"]),
+            _score=proposals_df["Cluster_Representative"].map(rep_rows["Top1_Score"]),
+            _variant=proposals_df["FullName_A"] != proposals_df["Cluster_Representative"],
+        ).sort_values(by=["_certain", "_score", "Cluster_Representative", "_variant", "FullName_A"])
+        return proposals_df.drop(columns=["_certain", "_score", "_variant"])
+    return proposals_df.sort_values(by=["Certain", "Top1_Score", "FullName_A"], ascending=[True, True, True])
+
+class ProgressiveProposals:
+    """Partial proposals while matching runs (--progressive).
+
+    Every `flush_seconds`, the rows matched since the last flush are written to a new
+    partial/proposed_matches_part_NNN.xlsx (never rewritten, so a part can stay open in Excel) and
+    appended to partial/proposed_matches_live.csv. add() runs on the join thread; files go through the
+    BackgroundWriter. Decisions made on these files are merged by load_decisions at Apply time.
+    """
+
+    def __init__(self, out_path: Path, writer: BackgroundWriter, flush_seconds: float = 30.0, cluster_names: bool = False):
+        self.dir = out_path / PROGRESSIVE_DIR
+        self.writer = writer
+        self.flush_seconds = flush_seconds
+        self.cluster_names = cluster_names
+        self.parts = 0
+        self._rows: list[dict] = []
+        self._columns: Optional[list] = None
+        self._csv_pending: list[pd.DataFrame] = []
+        self._last_flush = time.perf_counter()
+        archive_partial_dir(out_path)
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+    def add(self, entries: list[dict]) -> None:
+        self._rows.extend(entries)
+        if time.perf_counter() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.perf_counter()
+        if not self._rows:
+            return
+        part = pd.DataFrame(self._rows)
+        self._rows = []
+        if self._columns is None:
+            self._columns = list(part.columns)
+        part = sort_proposals(part.reindex(columns=self._columns), self.cluster_names)
+        self.parts += 1
+        name = f"proposed_matches_part_{self.parts:03d}.xlsx"
+        self.writer.submit(f"{PROGRESSIVE_DIR}/{name}", write_proposals_workbook, part, self.dir / name)
+        self.writer.submit(f"{PROGRESSIVE_DIR}/{PROGRESSIVE_LIVE_CSV} (part {self.parts})", self._append_live_csv, part)
+        print(f"[progressive] {PROGRESSIVE_DIR}/{name}: {len(part):,} name(s) ready for review")
+
+    def _append_live_csv(self, part: pd.DataFrame) -> None:
+        # Writer thread only. If the CSV is open (locked) in Excel, keep the rows for the next flush.
+        self._csv_pending.append(part)
+        path = self.dir / PROGRESSIVE_LIVE_CSV
+        try:
+            pd.concat(self._csv_pending).to_csv(path, mode="a", header=not path.exists(), index=False)
+        except PermissionError:
+            print(f"[progressive] {path.name} is locked (open in another program?); will retry on the next flush.")
+            return
+        self._csv_pending = []
+
+def archive_partial_dir(out_path: Path) -> Optional[Path]:
+    """Rename a previous run's partial/ folder to partial_<timestamp>/ so its decisions are kept but no
+    longer merged into the new proposals. Returns the new path, or None when there was nothing to move."""
+    partial_dir = out_path / PROGRESSIVE_DIR
+    if not partial_dir.is_dir() or not any(partial_dir.iterdir()):
+        return None
+    target = out_path / f"{PROGRESSIVE_DIR}_{time.strftime('%Y%m%d-%H%M%S', time.localtime(partial_dir.stat().st_mtime))}"
+    n = 1
+    while target.exists():
+        n += 1
+        target = target.with_name(f"{target.name.split('~')[0]}~{n}")
+    partial_dir.rename(target)
+    print(f"Moved previous partial proposals to {target.name}/")
+    return target
+
+def match_and_join(
+    df_a_clean: pd.DataFrame,
+    df_b: pd.DataFrame,
+    match_many,
+    timer: StageTimer,
+    queue_size: int = 256,
+    cluster_names: bool = False,
+    roster_index: Optional[RosterIndex] = None,
+    progressive: Optional["ProgressiveProposals"] = None,
+) -> Tuple[list[dict], list[dict]]:
+    """Producer/consumer matching: this thread runs match_many(names) (see make_matcher), which yields
+    (name, Top-k) for each unique File A name, and streams results through a bounded queue to a 'join' thread. That thread builds the proposal row and
+    the event rows for each name while matching continues. Event rows come back in File A order.
+    With cluster_names, only one representative per cluster of spellings (cluster_name_variants, split on
+    roster_index exact matches) is matched; every variant is re-scored against its Top-k rows
+    (variant_top_k), and its proposal rows carry Cluster_ID/Cluster_Size/Cluster_Representative.
+    With progressive, names without an exact roster match (roster_index) are matched first and every
+    proposal row is also handed to progressive.add on the join thread.
+    Returns (proposal_rows, joined_rows).
+    """
+    import queue
+
+    names = df_a_clean["FullName_A"].tolist()
+    hours = df_a_clean["CreditHours"].tolist()
+    events = df_a_clean["EventName"].tolist()
+    positions: Dict[str, list[int]] = {}
+    for pos, name in enumerate(names):
+        positions.setdefault(str(name), []).append(pos)
+    unique_names = sorted(positions)
+    clusters = {nm: [nm] for nm in unique_names}
+    if cluster_names:
+        with timer.stage("cluster File A names"):
+            clusters = cluster_name_variants({nm: len(pos) for nm, pos in positions.items()}, roster_index)
+            cluster_ids = {rep: n for n, rep in enumerate(sorted(clusters), start=1)}
+        print(f"Clustered {len(unique_names):,} File A spellings into {len(clusters):,} names to match.")
+        unique_names = sorted(clusters)
+    if progressive is not None:
+        # Names needing review first: no exact roster match means no Certain row
+        with timer.stage("order names (no exact match first)"):
+            has_exact = {nm: bool(roster_index.exact_hits(nm)) for nm in unique_names}
+            unique_names.sort(key=lambda nm: has_exact[nm])
+        n_hard = sum(not v for v in has_exact.values())
+        print(f"[progressive] {n_hard:,} of {len(unique_names):,} names have no exact roster match; matching them first.")
+
+    proposal_rows: list[dict] = []
+    joined_rows: list = [None] * len(names)
+    errors: list[BaseException] = []
+    results = queue.Queue(maxsize=queue_size)
+
+    def consume():
+        with timer.stage("event join (streamed)"):
+            while True:
+                item = results.get()
+                if item is None:
+                    return
+                if errors:
+                    continue  # keep draining so the producer never blocks
+                rep, tops = item
+                try:
+                    first_new = len(proposal_rows)
+                    for nm in clusters[rep]:
+                        # Variants share the representative's rows, but scores and flags are their own
+                        nm_tops = tops if nm == rep else variant_top_k(nm, tops, df_b, roster_index)
+                        entry = build_proposal_entry(nm, nm_tops, df_b)
+                        if cluster_names:
+                            entry = {
+                                "FullName_A": entry.pop("FullName_A"),
+                                "Cluster_ID": cluster_ids[rep],
+                                "Cluster_Size": len(clusters[rep]),
+                                "Cluster_Representative": rep,
+                                **entry,
+                            }
+                        proposal_rows.append(entry)
+                        for pos in positions[nm]:
+                            joined_rows[pos] = build_joined_event_row(names[pos], float(hours[pos]), events[pos], nm_tops, df_b)
+                    if progressive is not None:
+                        progressive.add(proposal_rows[first_new:])
+                except BaseException as e:
+                    errors.append(e)
+
+    joiner = threading.Thread(target=consume, name="join", daemon=True)
+    joiner.start()
+    try:
+        with timer.stage("match names"):
+            for nm, tops in match_many(unique_names):
+                results.put((nm, tops))
+    finally:
+        results.put(None)
+        joiner.join()
+    if errors:
+        raise errors[0]
+    return proposal_rows, joined_rows
+
+
 # ---------------------------
 # Main pipeline
 def _open_path(path: str):
@@ -369,6 +2075,16 @@ def _open_path(path: str):
             subprocess.Popen(["xdg-open", path])
     except Exception:
         pass
+# GUI "Split by" labels -> partition modes
+_GUI_PARTITION_CHOICES = {
+    "None": None,
+    "Category": "category",
+    "Category/Subcategory": "subcategory",
+}
+
+def _gui_partition_mode(label: str) -> Optional[str]:
+    return _GUI_PARTITION_CHOICES.get(label)
+
 def launch_gui():
     if tk is None:
         print("Tkinter not available in this environment. Install tkinter and try again.")
@@ -376,7 +2092,7 @@ def launch_gui():
 
     root = tk.Tk()
     root.title("Credit Hours Prep (No Certificates)")
-    root.geometry("720x520")
+    root.geometry("760x610")
 
     # Vars
     file_a_var = tk.StringVar()
@@ -386,6 +2102,69 @@ def launch_gui():
     min_match_var = tk.StringVar(value="0.85")
     decisions_var = tk.StringVar()
     overrides_var = tk.StringVar()
+    ledger_var = tk.StringVar()
+    partition_var = tk.StringVar(value="None")
+    profile_var = tk.BooleanVar(value=False)
+    engine_var = tk.StringVar(value="reference")
+    cluster_var = tk.BooleanVar(value=False)
+    progressive_var = tk.BooleanVar(value=False)
+    preload_var = tk.StringVar(value="File A: not selected  |  File B: not selected")
+
+    # Read File A and parse/collapse the roster in the background once a path is set (indexing the roster
+    # only when the chosen options use a RosterIndex), so Generate Proposals starts from ready data
+    input_cache = InputCache()
+    preload_state = {"df_a": ("File A", "not selected", None), "roster": ("File B", "not selected", None)}
+    preload_timers: Dict[str, str] = {}
+
+    def needs_roster_index():
+        return engine_var.get() != "reference" or cluster_var.get() or progressive_var.get()
+
+    def show_preload_state():
+        preload_var.set("  |  ".join(f"{label}: {status}" for label, status, _ in preload_state.values()))
+
+    def start_preload(kind, path):
+        label = preload_state[kind][0]
+
+        def on_done(fut):
+            # Runs on the worker thread; Tk widgets may only be touched from the Tk thread
+            def update():
+                if preload_state[kind][2] is not fut:
+                    return  # another file was picked meanwhile
+                try:
+                    result = fut.result()
+                    status = f"ready ({len(result):,} rows)" if kind == "df_a" else f"ready ({len(result[0]):,} people)"
+                except Exception:
+                    status = "could not read (details on Generate)"
+                preload_state[kind] = (label, status, fut)
+                show_preload_state()
+            root.after(0, update)
+
+        build_index = kind == "roster" and needs_roster_index()
+        fut = input_cache.preload(kind, path, build_index=build_index) if path.strip() else None
+        preload_state[kind] = (label, "loading..." if fut else ("file not found" if path.strip() else "not selected"), fut)
+        show_preload_state()
+        if fut:
+            fut.add_done_callback(on_done)
+
+    def schedule_preload(kind, var):
+        # Typing a path starts one preload after a short pause, not one per keystroke
+        if kind in preload_timers:
+            root.after_cancel(preload_timers.pop(kind))
+
+        def fire():
+            preload_timers.pop(kind, None)
+            start_preload(kind, var.get())
+        preload_timers[kind] = root.after(600, fire)
+
+    def options_changed(*_):
+        # Switching to an option that uses the RosterIndex builds it for the already loaded roster
+        if needs_roster_index() and file_b_var.get().strip() and "roster" not in preload_timers:
+            start_preload("roster", file_b_var.get())
+
+    file_a_var.trace_add("write", lambda *_: schedule_preload("df_a", file_a_var))
+    file_b_var.trace_add("write", lambda *_: schedule_preload("roster", file_b_var))
+    for option_var in (engine_var, cluster_var, progressive_var):
+        option_var.trace_add("write", options_changed)
 
     def pick_file_a():
         p = filedialog.askopenfilename(title="Select File A (Name, Hours, Event)", filetypes=[("Excel", ".xlsx .xls")])
@@ -393,7 +2172,7 @@ def launch_gui():
             file_a_var.set(p)
 
     def pick_file_b():
-        p = filedialog.askopenfilename(title="Select File B (Roster)", filetypes=[("Excel", ".xlsx .xls")])
+        p = filedialog.askopenfilename(title="Select File B (Roster)", filetypes=[("Excel or roster index", ".xlsx .xls .pdhidx")])
         if p:
             file_b_var.set(p)
 
@@ -412,6 +2191,12 @@ def launch_gui():
         if p:
             overrides_var.set(p)
 
+    def pick_ledger():
+        p = filedialog.asksaveasfilename(title="Select or create a credit-hour ledger", defaultextension=".sqlite",
+                                         confirmoverwrite=False, filetypes=[("Ledger", ".sqlite")])
+        if p:
+            ledger_var.set(p)
+
     # Layout helpers
     def row(label, var, picker=None):
         frame = ttk.Frame(main)
@@ -442,6 +2227,13 @@ def launch_gui():
             threading.Thread(target=target, daemon=True).start()
         return _wrapped
 
+    def show_warning(message):
+        # Called on the run's thread: hand the update to the Tk thread
+        def show():
+            log_var.set(log_var.get() + f"Warning: {message}\n")
+            messagebox.showwarning("Warning", message)
+        root.after(0, show)
+
     def btn_disable():
         for b in buttons:
             b.config(state="disabled")
@@ -451,6 +2243,8 @@ def launch_gui():
             b.config(state="normal")
 
     def do_generate_proposals():
+        if progressive_var.get():
+            log_var.set(log_var.get() + f"Partial proposals will appear in {Path(out_dir_var.get()) / PROGRESSIVE_DIR} as names are matched.\n")
         run_pipeline(
             file_a=file_a_var.get(),
             file_b=file_b_var.get(),
@@ -459,6 +2253,12 @@ def launch_gui():
             category_filter=(category_var.get() or None),
             overrides_csv=(overrides_var.get() or None),
             decisions_path=None,
+            profile=profile_var.get(),
+            match_engine=engine_var.get(),
+            input_cache=input_cache,
+            cluster_names=cluster_var.get(),
+            progressive=progressive_var.get(),
+            on_warning=show_warning,
         )
         # Open proposals file if present
         pm = Path(out_dir_var.get())/"proposed_matches.xlsx"
@@ -477,6 +2277,13 @@ def launch_gui():
             category_filter=(category_var.get() or None),
             overrides_csv=(overrides_var.get() or None),
             decisions_path=dec_path,
+            partition_by=_gui_partition_mode(partition_var.get()),
+            profile=profile_var.get(),
+            match_engine=engine_var.get(),
+            input_cache=input_cache,
+            cluster_names=cluster_var.get(),
+            ledger_path=(ledger_var.get() or None),
+            on_warning=show_warning,
         )
         # Open master list when done
         ml = Path(out_dir_var.get())/"master_list.xlsx"
@@ -496,6 +2303,7 @@ def launch_gui():
     row("Output Folder:", out_dir_var, pick_out_dir)
     row("Decisions File (opt):", decisions_var, pick_decisions)
     row("Overrides CSV (opt):", overrides_var, pick_overrides)
+    row("Ledger (opt):", ledger_var, pick_ledger)
 
     # Options row
     opts = ttk.Frame(main)
@@ -504,6 +2312,18 @@ def launch_gui():
     ttk.Entry(opts, textvariable=category_var, width=18).pack(side="left", padx=(4,10))
     ttk.Label(opts, text="Min Match (0-1):").pack(side="left")
     ttk.Entry(opts, textvariable=min_match_var, width=8).pack(side="left", padx=(4,10))
+    ttk.Label(opts, text="Split by:").pack(side="left")
+    ttk.Combobox(opts, textvariable=partition_var, values=list(_GUI_PARTITION_CHOICES), state="readonly", width=22).pack(side="left", padx=(4,10))
+
+    # Advanced options row
+    adv = ttk.Frame(main)
+    adv.pack(fill="x", padx=8, pady=(0,6))
+    ttk.Label(adv, text="Engine:").pack(side="left")
+    ttk.Combobox(adv, textvariable=engine_var, values=list(MATCH_ENGINES), state="readonly", width=10).pack(side="left", padx=(4,10))
+    ttk.Checkbutton(adv, text="Profile run", variable=profile_var).pack(side="left")
+    ttk.Checkbutton(adv, text="Cluster name variants", variable=cluster_var).pack(side="left", padx=(10,0))
+    ttk.Checkbutton(adv, text="Partial proposals while matching", variable=progressive_var).pack(side="left", padx=(10,0))
+    ttk.Label(main, textvariable=preload_var, foreground="#555").pack(fill="x", padx=8)
 
     # Buttons
     btns = ttk.Frame(main)
@@ -511,8 +2331,8 @@ def launch_gui():
     b1 = ttk.Button(btns, text="Generate Proposals", command=run_in_thread(do_generate_proposals))
     b2 = ttk.Button(btns, text="Apply Decisions", command=run_in_thread(do_apply_decisions))
     b3 = ttk.Button(btns, text="Open Output Folder", command=lambda: _open_path(out_dir_var.get()))
-    buttons = [b1, b2, b3]
-    for b in buttons:
+    buttons = [b1, b2]  # disabled while a run is going; the folder stays reachable for partial proposals
+    for b in buttons + [b3]:
         b.pack(side="left", padx=6)
 
     # Log area
@@ -537,351 +2357,862 @@ def run_pipeline(
     category_filter: Optional[str] = None,
     overrides_csv: Optional[str] = None,
     decisions_path: Optional[str] = None,
+    partition_by: Optional[str] = None,
+    profile: bool = False,
+    match_engine: str = "reference",
+    input_cache: Optional[InputCache] = None,
+    cluster_names: bool = False,
+    progressive: bool = False,
+    flush_seconds: float = 30.0,
+    ledger_path: Optional[str] = None,
+    event_date: Optional[str] = None,
+    ledger_batch: Optional[str] = None,
+    on_warning=None,
 ) -> None:
+    """Run the whole workflow. `on_warning(message)` receives warnings the user should see (default: print)."""
+    # With profile, the pipeline body runs directly inside the profiler (one run_pipeline frame per stack)
+    with profile_run(Path(out_dir)) if profile else nullcontext():
+        _run_pipeline(
+            file_a, file_b, out_dir, min_match=min_match, category_filter=category_filter,
+            overrides_csv=overrides_csv, decisions_path=decisions_path, partition_by=partition_by,
+            match_engine=match_engine, input_cache=input_cache, cluster_names=cluster_names,
+            progressive=progressive, flush_seconds=flush_seconds, ledger_path=ledger_path, event_date=event_date,
+            ledger_batch=ledger_batch, on_warning=on_warning,
+        )
+
+def _run_pipeline(
+    file_a: str,
+    file_b: str,
+    out_dir: str,
+    min_match: float = 0.85,
+    category_filter: Optional[str] = None,
+    overrides_csv: Optional[str] = None,
+    decisions_path: Optional[str] = None,
+    partition_by: Optional[str] = None,
+    match_engine: str = "reference",
+    input_cache: Optional[InputCache] = None,
+    cluster_names: bool = False,
+    progressive: bool = False,
+    flush_seconds: float = 30.0,
+    ledger_path: Optional[str] = None,
+    event_date: Optional[str] = None,
+    ledger_batch: Optional[str] = None,
+    on_warning=None,
+) -> None:
+    if partition_by and str(partition_by).strip().lower() not in PARTITION_MODES:
+        raise ValueError(f"Unknown partition mode '{partition_by}'. Use one of: {', '.join(PARTITION_MODES)}")
+    match_engine = (match_engine or "reference").strip().lower()
+    if match_engine not in MATCH_ENGINES:
+        raise ValueError(f"Unknown match engine '{match_engine}'. Use one of: {', '.join(MATCH_ENGINES)}")
+    event_date = parse_event_date(event_date)
 
     out_path = Path(out_dir)
     out_path.mkdir(parents=True, exist_ok=True)
-
-    # Files have a title in row 1; real data starts on row 2. Read with no header and skip the title row.
-    df_a_raw = pd.read_excel(file_a, header=None, skiprows=1)
-    df_a = df_a_raw.iloc[:, :3].copy()
-    df_a.columns = ["FullName_A", "CreditHours", "EventName"]
-    # Drop rows that are completely empty in those first 3 columns
-    df_a = df_a.dropna(how="all")
-    # Coerce CreditHours from mixed text (e.g., "2.0 Credit Hours") to float
-    df_a["CreditHours"] = df_a["CreditHours"].apply(parse_credit_hours)
-    df_a = df_a.dropna(subset=["FullName_A", "CreditHours"])
-    df_a["CreditHours"] = df_a["CreditHours"].astype(float)
-
-    # Files have a title in row 1; real data starts on row 2. Read with no header and skip the title row.
-    df_b_raw = pd.read_excel(file_b, header=None, skiprows=1)
-    df_b_raw = df_b_raw.iloc[:, :7].copy()
-    df_b_raw.columns = ["Category", "Subcategory", "Full Name", "Country", "Email", "CC Email", "First Conference"]
-    # Hard-assert: File B always has Email in column 5 (E); reassign from position to be bulletproof
-    df_b_raw["Email"] = df_b_raw.iloc[:, 4]
-
-    # Collapse roster to one row per email and log collisions
-    df_b, email_collisions = collapse_roster_by_email(df_b_raw)
-    if not email_collisions.empty:
-        email_collisions.to_excel(out_path / "roster_email_duplicates.xlsx", index=False)
-
-    # Step 1: Clean blatant duplicates in A
-    df_a_clean = dedupe_exact_file_a(df_a)
-
-    # Build proposed matches (per unique name in A) to aid manual review — SINGLE FILE
-    unique_names = sorted(set(df_a_clean["FullName_A"].astype(str)))
-    proposal_rows = []
-    for nm in unique_names:
-        tops = top_k_matches(nm, df_b, k=3)
-        entry = {"FullName_A": nm}
-        if tops:
-            idx1, sc1 = tops[0]
-            br1 = df_b.iloc[idx1]
-            entry["Top1_Name_B"] = br1.get("Full Name", "")
-            entry["Top1_Email"] = br1.get("Email", "")
-            entry["Top1_Score"] = round(float(sc1), 3)
-            # Decide "Certain" only when exact letters-only equality (spacing/punctuation-insensitive) with email present
-            is_certain = (entry.get("Top1_Score", 0.0) == 1.0) and is_spacing_punct_equal(nm, entry["Top1_Name_B"]) and bool(entry["Top1_Email"])
-            entry["Certain"] = bool(is_certain)
-
-            # Include Top2/Top3 only if NOT certain (to reduce clutter)
-            if not is_certain and len(tops) > 1:
-                idx2, sc2 = tops[1]
-                br2 = df_b.iloc[idx2]
-                entry["Top2_Name_B"] = br2.get("Full Name", "")
-                entry["Top2_Email"] = br2.get("Email", "")
-                entry["Top2_Score"] = round(float(sc2), 3)
-            else:
-                entry["Top2_Name_B"], entry["Top2_Email"], entry["Top2_Score"] = "", "", ""
-            if not is_certain and len(tops) > 2:
-                idx3, sc3 = tops[2]
-                br3 = df_b.iloc[idx3]
-                entry["Top3_Name_B"] = br3.get("Full Name", "")
-                entry["Top3_Email"] = br3.get("Email", "")
-                entry["Top3_Score"] = round(float(sc3), 3)
+    # Stages overlap: matching streams into the event join, and outputs are written by a background thread
+    timer = StageTimer()
+    writer = BackgroundWriter(timer)
+    try:
+        # Read File A, File B (collapsed to one row per email), decisions and overrides concurrently
+        with timer.stage("load inputs"):
+            inputs = load_inputs(file_a, file_b, decisions_path=decisions_path, overrides_csv=overrides_csv, cache=input_cache)
+        df_a = inputs["df_a"]
+        df_b, email_collisions = inputs["roster"]
+        for message in getattr(inputs["roster_index"], "warnings", ()):
+            (on_warning or (lambda m: print(f"Warning: {m}")))(message)
+        if not email_collisions.empty:
+            writer.submit("roster_email_duplicates.xlsx", email_collisions.to_excel,
+                          out_path / "roster_email_duplicates.xlsx", index=False)
+
+        # Step 1: Clean blatant duplicates in A
+        with timer.stage("dedupe File A"):
+            df_a_clean = dedupe_exact_file_a(df_a)
+
+        # Step 2: Match each unique name in A (Top 3 for review) and stream results into the event-level join.
+        # Each event row uses its name's Top1, so names are matched once instead of once per event row.
+        with timer.stage(f"prepare '{match_engine}' match engine"):
+            roster_index = inputs["roster_index"]
+            if (cluster_names or progressive) and roster_index is None:
+                roster_index = RosterIndex(df_b)  # clustering and progressive ordering check exact roster matches
+            match_many = make_matcher(df_b, match_engine, k=3, index=roster_index)
+
+        # A new round of proposals (no decisions file): set aside partial files left by an earlier progressive run
+        partial = None
+        if decisions_path is None:
+            if progressive:
+                partial = ProgressiveProposals(out_path, writer, flush_seconds=flush_seconds, cluster_names=cluster_names)
             else:
-                entry["Top3_Name_B"], entry["Top3_Email"], entry["Top3_Score"] = "", "", ""
-
-            # Suggested + decision fields
-            entry["Suggested_Email"] = entry.get("Top1_Email", "")
-            # Auto-accept only when Certain; otherwise leave blank for human review
-            entry["Decision"] = "ACCEPT" if is_certain else ""
-            entry["Chosen_Email"] = ""
-            # New: allow user to enter 1/2/3 or a manual email in the proposals sheet
-            entry["Pick"] = "1" if is_certain else ""
-        else:
-            # No candidates — force review
-            entry.update({
-                "Top1_Name_B": "", "Top1_Email": "", "Top1_Score": "",
-                "Top2_Name_B": "", "Top2_Email": "", "Top2_Score": "",
-                "Top3_Name_B": "", "Top3_Email": "", "Top3_Score": "",
-                "Certain": False, "Suggested_Email": "", "Decision": "", "Chosen_Email": "", "Pick": ""
-            })
-        proposal_rows.append(entry)
-
-    proposals_df = pd.DataFrame(proposal_rows)
-    # Sort so items needing attention appear first and greens last
-    proposals_df = proposals_df.sort_values(by=["Certain", "Top1_Score", "FullName_A"], ascending=[True, True, True])
-
-    # Write ONE Excel (no conditional formatting for auto-certain rows)
-    from openpyxl import Workbook
-    from openpyxl.utils.dataframe import dataframe_to_rows
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Proposed Matches"
-
-    for r in dataframe_to_rows(proposals_df, index=False, header=True):
-        ws.append(r)
-
-    # Green highlight for rows where Certain == TRUE
-    from openpyxl.styles import PatternFill
-    from openpyxl.formatting.rule import FormulaRule
-
-    header = [cell.value for cell in ws[1]]
-    if "Certain" in header:
-        certain_col_idx = header.index("Certain") + 1
-        last_row = ws.max_row
-        last_col_letter = ws.cell(row=1, column=ws.max_column).column_letter
-        certain_col_letter = ws.cell(row=1, column=certain_col_idx).column_letter
-        green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-        rule = FormulaRule(formula=[f"${certain_col_letter}2=TRUE"], stopIfTrue=False, fill=green_fill)
-        ws.conditional_formatting.add(f"A2:{last_col_letter}{last_row}", rule)
-
-    pm_path = Path(out_dir)/"proposed_matches.xlsx"
-    wb.save(pm_path)
-
-    # Step 2: Event-level fuzzy matching
-    joined_rows = []
-    for _, r in df_a_clean.iterrows():
-        name_a = r["FullName_A"]
-        hours = float(r["CreditHours"])
-        event = r["EventName"]
-        match_row, score = fuzzy_match_name_to_b_row(name_a, df_b, min_match)
-
-        if match_row is None:
-            joined_rows.append({
-                "FullName_A": name_a,
-                "EventName": event,
-                "CreditHours": hours,
-                "MatchedName_B": "",
-                "Email": "",
-                "Category": "",
-                "Subcategory": "",
-                "Country": "",
-                "CC Email": "",
-                "First Conference": "",
-                "MatchScore": round(float(score), 3) if score else 0.0,
-                "MatchSource": "FUZZY_NO_MATCH",
-                "ReviewFlag": "NO_MATCH_OR_LOW_SCORE",
-                "Confidence": round(float(score), 3) if score else 0.0,
-                "AssumedEmail": "",
-                "AssumedName": "",
-            })
+                archive_partial_dir(out_path)
+        proposal_rows, joined_rows = match_and_join(
+            df_a_clean, df_b, match_many, timer, cluster_names=cluster_names, roster_index=roster_index,
+            progressive=partial,
+        )
+        if partial is not None:
+            partial.flush()
+
+        with timer.stage("sort proposals"):
+            proposals_df = sort_proposals(pd.DataFrame(proposal_rows), cluster_names)
+            df_joined_events = pd.DataFrame(joined_rows)
+
+        # Write ONE Excel (proposals) and the pre-override join in the background.
+        # Applying the reviewed proposed_matches.xlsx from this folder keeps it: rewriting it would drop the edits.
+        proposals_path = out_path / "proposed_matches.xlsx"
+        if (decisions_path is not None and Path(decisions_path).exists() and proposals_path.exists()
+                and os.path.samefile(decisions_path, proposals_path)):
+            print(f"Keeping your reviewed {proposals_path.name} (not overwritten with new proposals).")
         else:
-            joined_rows.append({
-                "FullName_A": name_a,
-                "EventName": event,
-                "CreditHours": hours,
-                "MatchedName_B": match_row["Full Name"],
-                "Email": match_row["Email"],
-                "Category": match_row["Category"],
-                "Subcategory": match_row["Subcategory"],
-                "Country": match_row["Country"],
-                "CC Email": match_row["CC Email"],
-                "First Conference": match_row["First Conference"],
-                "MatchScore": round(float(score), 3),
-                "MatchSource": "FUZZY_NAME",
-                "ReviewFlag": "",
-                "Confidence": round(float(score), 3),
-                "AssumedEmail": match_row["Email"],
-                "AssumedName": match_row["Full Name"],
-            })
-
-    df_joined_events = pd.DataFrame(joined_rows)
-    df_joined_events.to_excel(out_path / "joined_events_pre_overrides.xlsx", index=False)
-
-    # Optional: apply decisions from the single proposed_matches file (xlsx or csv)
-    if decisions_path is None:
-        default_pm = Path(out_dir)/"proposed_matches.xlsx"
-        decisions_path = str(default_pm) if default_pm.exists() else None
-
-    if decisions_path:
-        dec_path = Path(decisions_path)
-        if dec_path.exists():
-            if dec_path.suffix.lower() == ".xlsx":
-                dec = pd.read_excel(dec_path).fillna("")
-            else:
-                dec = pd.read_csv(dec_path).fillna("")
-            # Normalize headers
-            cmap = {c.lower().strip(): c for c in dec.columns}
-            fnc   = cmap.get("fullname_a") or "FullName_A"
-            sugg  = cmap.get("suggested_email") or "Suggested_Email"
-            deci  = cmap.get("decision") or "Decision"
-            chosen = cmap.get("chosen_email") or "Chosen_Email"
-            # Optional Top columns (may not be present in CSVs)
-            t1n = cmap.get("top1_name_b") or "Top1_Name_B"
-            t1e = cmap.get("top1_email")  or "Top1_Email"
-            t2n = cmap.get("top2_name_b") or "Top2_Name_B"
-            t2e = cmap.get("top2_email")  or "Top2_Email"
-            t3n = cmap.get("top3_name_b") or "Top3_Name_B"
-            t3e = cmap.get("top3_email")  or "Top3_Email"
-            pick = cmap.get("pick") or "Pick"
-
-            needed_cols = [fnc, sugg, deci, chosen, t1n, t1e, t2n, t2e, t3n, t3e, pick]
-            for c in needed_cols:
-                if c not in dec.columns:
-                    dec[c] = ""
-            dec = dec[[fnc, sugg, deci, chosen, t1n, t1e, t2n, t2e, t3n, t3e, pick]].copy()
-            dec.columns = ["FullName_A", "Suggested_Email", "Decision", "Chosen_Email",
-                           "Top1_Name_B", "Top1_Email", "Top2_Name_B", "Top2_Email", "Top3_Name_B", "Top3_Email", "Pick"]
-
-            df_joined_events = df_joined_events.merge(dec, on="FullName_A", how="left")
-
-            # Prepare a roster lookup by Email to enrich fields (Category, Subcategory, Country, etc.)
-            bcols = ["Full Name", "Category", "Subcategory", "Country", "CC Email", "First Conference"]
-            # Use positional column 5 (E) for Email to avoid any header/title inconsistencies
-            email_series = df_b.iloc[:, 4]
-            non_null = email_series.notna() & (email_series.astype(str).str.strip() != "")
-            b_lookup_by_email = (
-                df_b.loc[non_null].set_index(email_series[non_null])[bcols].to_dict(orient="index")  # type: ignore
-            )
-
-            # Apply decisions (ACCEPT/REJECT) with optional Chosen_Email mapped to Top candidates or Pick
-            for idx, row in df_joined_events.iterrows():
-                decision = str(row.get("Decision", "")).strip().upper()
-                chosen_email = str(row.get("Chosen_Email", "")).strip()
-                suggested_email = str(row.get("Suggested_Email", "")).strip()
-                # Resolve Pick (user can enter 1/2/3 to select TopN, or type a manual email)
-                pick_val = str(row.get("Pick", "")).strip()
-                if pick_val:
-                    if pick_val in {"1", "2", "3"}:
-                        if pick_val == "1" and str(row.get("Top1_Email", "")).strip():
-                            chosen_email = str(row.get("Top1_Email", "")).strip()
-                        elif pick_val == "2" and str(row.get("Top2_Email", "")).strip():
-                            chosen_email = str(row.get("Top2_Email", "")).strip()
-                        elif pick_val == "3" and str(row.get("Top3_Email", "")).strip():
-                            chosen_email = str(row.get("Top3_Email", "")).strip()
-                    elif "@" in pick_val:
-                        chosen_email = pick_val
-                # Accept if decision is ACCEPT, or if Pick is filled (unless explicitly REJECT)
-                if decision == "ACCEPT" or (decision == "" and pick_val):
-                    email_to_set = chosen_email or suggested_email
-                    if email_to_set:
-                        # Determine the chosen candidate name from Top1/Top2/Top3 based on the selected email or Pick
-                        chosen_name = ""
-                        if email_to_set == str(row.get("Top1_Email", "")).strip():
-                            chosen_name = str(row.get("Top1_Name_B", "")).strip()
-                        elif email_to_set == str(row.get("Top2_Email", "")).strip():
-                            chosen_name = str(row.get("Top2_Name_B", "")).strip()
-                        elif email_to_set == str(row.get("Top3_Email", "")).strip():
-                            chosen_name = str(row.get("Top3_Name_B", "")).strip()
-                        elif not chosen_email and not pick_val:
-                            # If using Suggested (Top1) but Top columns weren't merged (CSV), fall back
-                            chosen_name = str(row.get("Top1_Name_B", "")) or ""
-                        else:
-                            # Manual email typed in Pick or Chosen_Email: look up in roster
-                            rec_manual = b_lookup_by_email.get(email_to_set)
-                            if rec_manual:
-                                chosen_name = str(rec_manual.get("Full Name", "")).strip()
-                            else:
-                                # Email not found in roster; flag for review
-                                df_joined_events.at[idx, "ReviewFlag"] = "EMAIL_NOT_IN_ROSTER"
-
-                        # Set core fields
-                        df_joined_events.at[idx, "Email"] = email_to_set
-                        if chosen_name:
-                            df_joined_events.at[idx, "MatchedName_B"] = chosen_name
-                        elif not str(row.get("MatchedName_B", "")).strip():
-                            df_joined_events.at[idx, "MatchedName_B"] = row.get("FullName_A", "")
-
-                        # Enrich remaining roster fields using the selected Email
-                        rec = b_lookup_by_email.get(email_to_set)
-                        if rec:
-                            df_joined_events.at[idx, "Category"] = rec.get("Category", "")
-                            df_joined_events.at[idx, "Subcategory"] = rec.get("Subcategory", "")
-                            df_joined_events.at[idx, "Country"] = rec.get("Country", "")
-                            df_joined_events.at[idx, "CC Email"] = rec.get("CC Email", "")
-                            df_joined_events.at[idx, "First Conference"] = rec.get("First Conference", "")
-
-                        df_joined_events.at[idx, "MatchSource"] = "USER_ACCEPTED"
-                        if df_joined_events.at[idx, "ReviewFlag"] == "EMAIL_NOT_IN_ROSTER":
-                            pass
-                        else:
-                            df_joined_events.at[idx, "ReviewFlag"] = ""
-                elif decision == "REJECT":
-                    df_joined_events.at[idx, "Email"] = ""
-                    df_joined_events.at[idx, "MatchSource"] = "USER_REJECTED"
-                    df_joined_events.at[idx, "ReviewFlag"] = "REJECTED_NEEDS_EMAIL"
-
-    # Mark low-confidence auto-assignments
-    low_mask = (df_joined_events["Confidence"].fillna(0) < float(min_match)) & (df_joined_events["Email"].astype(str).str.strip() != "")
-    df_joined_events.loc[low_mask, "ReviewFlag"] = df_joined_events.loc[low_mask, "ReviewFlag"].replace("", "LOW_CONFIDENCE_AUTOASSIGN")
-
-    # Step 3: Apply manual overrides
-    overrides_df = load_overrides(overrides_csv) if overrides_csv else None
-    df_joined_events = apply_overrides_event_level(df_joined_events, df_b, overrides_df)
-    df_joined_events.to_excel(out_path / "joined_events.xlsx", index=False)
-
-    # Step 4: Deduplicate by (Email, EventName) to prevent overcounting
-    df_with_email = df_joined_events[df_joined_events["Email"].astype(str).str.strip() != ""].copy()
-    df_without_email = df_joined_events[df_joined_events["Email"].astype(str).str.strip() == ""].copy()
+            writer.submit("proposed_matches.xlsx", write_proposals_workbook, proposals_df, proposals_path)
+        writer.submit("joined_events_pre_overrides.xlsx", df_joined_events.copy().to_excel,
+                      out_path / "joined_events_pre_overrides.xlsx", index=False)
+
+        # Optional: apply decisions from the single proposed_matches file (xlsx or csv).
+        # An explicit decisions file was read up front; otherwise fall back to the proposals just written.
+        dec = inputs["decisions"]
+        if decisions_path is None:
+            writer.wait("proposed_matches.xlsx")
+            dec = load_decisions(str(proposals_path))
+
+        with timer.stage("apply decisions + overrides"):
+            if dec is not None:
+                df_joined_events = apply_decisions_event_level(df_joined_events, dec, df_b)
+
+            # Mark low-confidence auto-assignments
+            low_mask = (df_joined_events["Confidence"].fillna(0) < float(min_match)) & (df_joined_events["Email"].astype(str).str.strip() != "")
+            df_joined_events.loc[low_mask, "ReviewFlag"] = df_joined_events.loc[low_mask, "ReviewFlag"].replace("", "LOW_CONFIDENCE_AUTOASSIGN")
+
+            # Step 3: Apply manual overrides
+            overrides_df = inputs["overrides"]
+            df_joined_events = apply_overrides_event_level(df_joined_events, df_b, overrides_df)
+        writer.submit("joined_events.xlsx", df_joined_events.to_excel, out_path / "joined_events.xlsx", index=False)
+
+        with timer.stage("dedupe + aggregate"):
+            # Step 4: Deduplicate by (Email, EventName) to prevent overcounting
+            df_with_email_dedup, removed_dups, df_without_email = dedupe_by_email_event(df_joined_events)
+
+            # Step 5: Aggregate hours by Email
+            totals = aggregate_totals_by_email(df_with_email_dedup, df_b)
+
+        # Optional: keep this File A's facts in the cross-event ledger (replacing an earlier run of the same file)
+        if ledger_path:
+            with timer.stage("update ledger"):
+                update_ledger(ledger_path, df_with_email_dedup, df_b, file_a, event_date=event_date, batch=ledger_batch)
+        if not removed_dups.empty:
+            writer.submit("duplicates_removed_same_email_event.xlsx", removed_dups.to_excel,
+                          out_path / "duplicates_removed_same_email_event.xlsx", index=False)
+        # Log unmatched (no email) for manual fix
+        if not df_without_email.empty:
+            writer.submit("unmatched_needs_email.xlsx", df_without_email.to_excel,
+                          out_path / "unmatched_needs_email.xlsx", index=False)
+
+        # Step 6: Optional Category filter (one category, or a comma-separated list)
+        categories = parse_category_list(category_filter)
+        if categories:
+            mask = totals["Category"].astype(str).str.strip().str.lower().isin(categories)
+            excluded = totals[~mask].copy()
+            if not excluded.empty:
+                writer.submit("excluded_by_category.xlsx", excluded.to_excel, out_path / "excluded_by_category.xlsx", index=False)
+            totals = totals[mask].copy()
+
+        # Step 7: Exports
+        master_cols = ["DisplayName", "Email", "TotalCreditHours", "Category", "Subcategory"]
+        writer.submit("master_list.xlsx", totals[master_cols].to_excel, out_path / "master_list.xlsx", index=False)
+        writer.submit("master_list.csv", totals[master_cols].to_csv, out_path / "master_list.csv", index=False)
+
+        # Optional: one master list per Category (or Category/Subcategory) from the same totals
+        if partition_by:
+            writer.submit(f"master_lists_by_{partition_by}", write_partitioned_master_lists, totals, out_path, partition_by, master_cols)
+
+        # Extra: quick audit table
+        audit_cols = ["FullName_A", "MatchedName_B", "Email", "EventName", "CreditHours", "MatchScore", "MatchSource"]
+        writer.submit("event_level_audit.xlsx", df_with_email_dedup[audit_cols].to_excel, out_path / "event_level_audit.xlsx", index=False)
+    finally:
+        # Every output is on disk (or failed) before returning: the GUI opens them next, and a failed
+        # run must not keep writing after its error is shown. close() re-raises the first write error.
+        writer.close()
+    timer.report(out_path)
+    print(f"Done. Outputs in: {out_path.resolve()}")
 
-    # Prefer higher MatchScore for duplicates with same (Email, EventName)
-    df_with_email = df_with_email.sort_values(by=["Email", "EventName", "MatchScore"], ascending=[True, True, False])
 
-    # Mark removed duplicates (same Email+Event)
-    dup_mask = df_with_email.duplicated(subset=["Email", "EventName"], keep="first")
-    removed_dups = df_with_email[dup_mask].copy()
-    if not removed_dups.empty:
-        removed_dups.to_excel(out_path / "duplicates_removed_same_email_event.xlsx", index=False)
+# ---------------------------
+# Credit-hour ledger (--ledger, ledger-export)
+# ---------------------------
 
-    df_with_email_dedup = df_with_email[~dup_mask].copy()
+# SQLite file of (Email, EventName) credit-hour facts kept across runs. Each File A is one batch (keyed by
+# its content hash, or a name given with --ledger_batch): re-running a file replaces that batch's facts, so
+# runs can be repeated (e.g. after corrected decisions) without double counting, and a new batch costs only
+# its own rows. Event dates are kept per batch, so recording a later File A never re-dates an earlier one:
+# the same EventName on two dates is two events. Facts for the same (Email, EventName, EventDate) from
+# different batches are deduplicated when reading, as dedupe_by_email_event does.
+# Name/attribute columns are untyped so values keep the type they had in the sheets (e.g. numeric names).
+LEDGER_SCHEMA_VERSION = 2
+_LEDGER_FACT_COLUMNS = [
+    "Email", "EventName", "CreditHours", "MatchScore", "MatchSource", "FullName_A", "MatchedName_B",
+    "DisplayName", "Category", "Subcategory", "Country", "First Conference",
+]
+_LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS batches (
+    BatchNo INTEGER PRIMARY KEY AUTOINCREMENT, Batch TEXT UNIQUE NOT NULL,
+    Source TEXT, LoadedAt TEXT, Rows INTEGER
+);
+CREATE TABLE IF NOT EXISTS batch_events (BatchNo INTEGER NOT NULL, EventName, EventDate TEXT);
+CREATE TABLE IF NOT EXISTS facts (
+    BatchNo INTEGER NOT NULL, Seq INTEGER NOT NULL,
+    Email, EventName, CreditHours REAL, MatchScore REAL, MatchSource,
+    FullName_A, MatchedName_B, DisplayName, Category, Subcategory, Country, "First Conference",
+    PRIMARY KEY (BatchNo, Seq)
+);
+CREATE INDEX IF NOT EXISTS facts_event ON facts (EventName);
+CREATE INDEX IF NOT EXISTS batch_events_batch ON batch_events (BatchNo, EventName);
+CREATE INDEX IF NOT EXISTS batch_events_date ON batch_events (EventDate);
+"""
 
-    # Step 5: Aggregate hours by Email
-    # Log unmatched (no email) for manual fix
-    if not df_without_email.empty:
-        df_without_email.to_excel(out_path / "unmatched_needs_email.xlsx", index=False)
+def parse_event_date(value) -> Optional[str]:
+    """Validate a YYYY-MM-DD date; returns it in ISO form (None stays None)."""
+    import datetime
 
-    # Pick a canonical display name per email (from collapsed File B), else fallback
-    canonical_name_map = (
-        df_b[["Email", "Full Name"]].drop_duplicates().set_index("Email")["Full Name"].to_dict()
+    if value is None or not str(value).strip():
+        return None
+    try:
+        return datetime.date.fromisoformat(str(value).strip()).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}'. Use YYYY-MM-DD, e.g. 2026-03-14.")
+
+def open_ledger(path):
+    """Open (creating if needed) a credit-hour ledger file. Use ':memory:' for a throwaway ledger."""
+    import sqlite3
+
+    conn = sqlite3.connect(str(path))
+    conn.executescript(_LEDGER_SCHEMA)
+    with conn:
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)", (str(LEDGER_SCHEMA_VERSION),))
+    version = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()[0]
+    if version == "1":
+        # Format 1 dated each EventName once for all batches: give every batch that date
+        with conn:
+            conn.execute("INSERT INTO batch_events (BatchNo, EventName, EventDate) "
+                         "SELECT DISTINCT f.BatchNo, f.EventName, e.EventDate FROM facts f "
+                         "LEFT JOIN events e ON e.EventName IS f.EventName")
+            conn.execute("DROP TABLE events")
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'schema_version'", (str(LEDGER_SCHEMA_VERSION),))
+        version = str(LEDGER_SCHEMA_VERSION)
+    if version != str(LEDGER_SCHEMA_VERSION):
+        conn.close()
+        raise ValueError(f"Ledger {path} has format version {version}; this script reads version {LEDGER_SCHEMA_VERSION}.")
+    return conn
+
+def ledger_ingest(conn, facts: pd.DataFrame, batch: str, source: str = "", event_date: Optional[str] = None) -> int:
+    """Replace the facts of `batch` with `facts` (rows with an Email and a DisplayName, see with_display_name)
+    in one transaction. The batch's events get `event_date` if given; otherwise the date they had in this
+    batch before, else the latest date another batch recorded for the same EventName, else today.
+    Returns the number of facts the batch had before."""
+    import datetime
+
+    today = datetime.date.today().isoformat()
+    cols = facts.reindex(columns=_LEDGER_FACT_COLUMNS)
+    # NaN -> NULL; numpy scalars -> Python values sqlite3 can bind
+    values = cols.astype(object).where(cols.notna(), None).values.tolist()
+    with conn:
+        conn.execute(
+            "INSERT INTO batches (Batch, Source, LoadedAt, Rows) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (Batch) DO UPDATE SET Source = excluded.Source, LoadedAt = excluded.LoadedAt, Rows = excluded.Rows",
+            (batch, source, datetime.datetime.now().isoformat(timespec="seconds"), len(values)),
+        )
+        batch_no = conn.execute("SELECT BatchNo FROM batches WHERE Batch = ?", (batch,)).fetchone()[0]
+        replaced = conn.execute("DELETE FROM facts WHERE BatchNo = ?", (batch_no,)).rowcount
+        event_names = list(dict.fromkeys(row[1] for row in values))
+        dates = {}
+        if not event_date:
+            for ev in event_names:
+                known = conn.execute(
+                    "SELECT EventDate FROM batch_events WHERE EventName IS ? "
+                    "ORDER BY BatchNo = ? DESC, EventDate DESC LIMIT 1", (ev, batch_no),
+                ).fetchone()
+                dates[ev] = known[0] if known else None
+        conn.execute("DELETE FROM batch_events WHERE BatchNo = ?", (batch_no,))
+        placeholders = ", ".join("?" * (len(_LEDGER_FACT_COLUMNS) + 2))
+        quoted = ", ".join(f'"{c}"' for c in _LEDGER_FACT_COLUMNS)
+        conn.executemany(
+            f"INSERT INTO facts (BatchNo, Seq, {quoted}) VALUES ({placeholders})",
+            ([batch_no, seq] + row for seq, row in enumerate(values)),
+        )
+        conn.executemany(
+            "INSERT INTO batch_events (BatchNo, EventName, EventDate) VALUES (?, ?, ?)",
+            ((batch_no, ev, event_date or dates.get(ev) or today) for ev in event_names),
+        )
+    return replaced
+
+def ledger_other_dates(conn, batch: str) -> list[tuple]:
+    """(EventName, this batch's date, other date) for events of `batch` that other batches recorded on another date."""
+    return conn.execute(
+        "SELECT DISTINCT b.EventName, b.EventDate, o.EventDate FROM batch_events b "
+        "JOIN batches USING (BatchNo) "
+        "JOIN batch_events o ON o.EventName IS b.EventName AND o.BatchNo != b.BatchNo AND o.EventDate IS NOT b.EventDate "
+        "WHERE batches.Batch = ? ORDER BY b.EventName, o.EventDate", (batch,),
+    ).fetchall()
+
+def update_ledger(ledger_path, df_with_email_dedup: pd.DataFrame, df_b: pd.DataFrame, file_a: str,
+                  event_date: Optional[str] = None, batch: Optional[str] = None) -> None:
+    """Record this run's deduplicated event rows in the ledger as File A's batch (`batch` names it instead)."""
+    conn = open_ledger(ledger_path)
+    try:
+        facts = with_display_name(df_with_email_dedup, df_b)
+        batch = f"name:{batch.strip()}" if batch and batch.strip() else _file_digest(file_a)
+        replaced = ledger_ingest(conn, facts, batch, source=str(file_a), event_date=event_date)
+        other_dates = ledger_other_dates(conn, batch)
+    finally:
+        conn.close()
+    action = f"replaced {replaced:,} earlier facts of this batch" if replaced else "new batch"
+    print(f"Ledger: {len(facts):,} facts recorded in {Path(ledger_path).resolve()} ({action}).")
+    for ev, date, other in other_dates:
+        print(f"Ledger: '{ev}' ({date}) is also recorded on {other} by another batch; the dates are counted as separate events.")
+
+def ledger_facts(conn, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                 events: Optional[list] = None) -> pd.DataFrame:
+    """One fact per (Email, EventName, EventDate) for the selected events, kept and ordered as
+    dedupe_by_email_event does (highest MatchScore; ties go to the earliest loaded row)."""
+    where, params = ["f.Email IS NOT NULL"], []
+    if date_from:
+        where.append("be.EventDate >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("be.EventDate <= ?")
+        params.append(date_to)
+    if events:
+        where.append(f"f.EventName IN ({', '.join('?' * len(events))})")
+        params.extend(events)
+    quoted = ", ".join(f'f."{c}"' for c in _LEDGER_FACT_COLUMNS)
+    sql = (f"SELECT f.BatchNo, f.Seq, {quoted}, be.EventDate FROM facts f "
+           f"LEFT JOIN batch_events be ON be.BatchNo = f.BatchNo AND be.EventName IS f.EventName "
+           f"WHERE {' AND '.join(where)}")
+    columns = _LEDGER_FACT_COLUMNS + ["EventDate"]
+    df = pd.DataFrame(conn.execute(sql, params).fetchall(), columns=["BatchNo", "Seq"] + columns)
+    # A sort + duplicated pass is cheaper here than a SQL window over the whole selection
+    df = df.sort_values(["Email", "EventName", "EventDate", "MatchScore", "BatchNo", "Seq"],
+                        ascending=[True, True, True, False, True, True])
+    return df[~df.duplicated(subset=["Email", "EventName", "EventDate"])][columns].reset_index(drop=True)
+
+def ledger_events(conn, facts: pd.DataFrame) -> pd.DataFrame:
+    """Every (EventName, EventDate) in the ledger, and the people and hours it adds to `facts`."""
+    events = pd.DataFrame(
+        conn.execute("SELECT DISTINCT EventName, EventDate FROM batch_events ORDER BY EventDate, EventName").fetchall(),
+        columns=["EventName", "EventDate"],
     )
-    df_with_email_dedup["DisplayName"] = (
-        df_with_email_dedup["Email"].map(canonical_name_map)
-        .fillna(df_with_email_dedup["MatchedName_B"])
-        .fillna(df_with_email_dedup["FullName_A"])
+    per_event = facts.groupby(["EventName", "EventDate"]).agg(People=("Email", "size"), TotalCreditHours=("CreditHours", "sum"))
+    events = events.merge(per_event, how="left", left_on=["EventName", "EventDate"], right_index=True)
+    # Numeric first: with no facts selected the merged columns are object dtype
+    events["People"] = pd.to_numeric(events["People"]).fillna(0).astype(int)
+    events["TotalCreditHours"] = pd.to_numeric(events["TotalCreditHours"]).fillna(0.0).round(2)
+    events["Included"] = events["People"] > 0
+    return events
+
+def ledger_totals(conn, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                  events: Optional[list] = None) -> pd.DataFrame:
+    """Per-email totals (same columns as aggregate_totals_by_email) for a date range and/or event set."""
+    return totals_by_email(ledger_facts(conn, date_from=date_from, date_to=date_to, events=events))
+
+def cmd_ledger_export(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="run_me_nocerts.py ledger-export",
+        description="Write a master list from a credit-hour ledger (built with --ledger) for a date range "
+                    "and/or a set of events, without re-reading or re-matching File A.",
     )
+    parser.add_argument("--ledger", required=True, help="Ledger file written by runs with --ledger")
+    parser.add_argument("--out_dir", default="output_nocerts", help="Where to write master_list.xlsx/.csv and ledger_events.xlsx")
+    parser.add_argument("--from", dest="date_from", required=False, help="First event date to include (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", required=False, help="Last event date to include (YYYY-MM-DD)")
+    parser.add_argument("--events", required=False, help="Only these events (comma-separated EventName values)")
+    parser.add_argument("--category", required=False, help="Optional Category filter (e.g., 'User' or 'User,Speaker')")
+    parser.add_argument("--partition_by", choices=sorted(PARTITION_MODES), required=False,
+                        help="Also write one master list per Category ('category') or Category/Subcategory ('subcategory')")
+    args = parser.parse_args(argv)
+
+    if not Path(args.ledger).exists():
+        parser.error(f"ledger not found: {args.ledger}")
+    try:
+        date_from, date_to = parse_event_date(args.date_from), parse_event_date(args.date_to)
+    except ValueError as e:
+        parser.error(str(e))
+    events = [e.strip() for e in args.events.split(",") if e.strip()] if args.events else None
 
-    totals = df_with_email_dedup.groupby(["Email"], as_index=False).agg({
-        "DisplayName": "first",
-        "Category": "first",
-        "Subcategory": "first",
-        "Country": "first",
-        "First Conference": "first",
-        "CreditHours": "sum",
-    })
-    totals["TotalCreditHours"] = totals["CreditHours"].astype(float).round(2)
-    totals = totals.drop(columns=["CreditHours"])
-
-    # Step 6: Optional Category filter
-    if category_filter:
-        mask = totals["Category"].astype(str).str.strip().str.lower() == category_filter.strip().lower()
+    out_path = Path(args.out_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+    conn = open_ledger(args.ledger)
+    try:
+        facts = ledger_facts(conn, date_from=date_from, date_to=date_to, events=events)
+        ledger_events(conn, facts).to_excel(out_path / "ledger_events.xlsx", index=False)
+    finally:
+        conn.close()
+
+    totals = totals_by_email(facts)
+    categories = parse_category_list(args.category)
+    if categories:
+        mask = totals["Category"].astype(str).str.strip().str.lower().isin(categories)
         excluded = totals[~mask].copy()
         if not excluded.empty:
             excluded.to_excel(out_path / "excluded_by_category.xlsx", index=False)
         totals = totals[mask].copy()
-
-    # Step 7: Exports
     master_cols = ["DisplayName", "Email", "TotalCreditHours", "Category", "Subcategory"]
     totals[master_cols].to_excel(out_path / "master_list.xlsx", index=False)
     totals[master_cols].to_csv(out_path / "master_list.csv", index=False)
+    if args.partition_by:
+        write_partitioned_master_lists(totals, out_path, args.partition_by, master_cols)
+    print(f"Ledger master list: {len(totals):,} people, {totals['TotalCreditHours'].sum():,.2f} hours. Outputs in: {out_path.resolve()}")
+    return 0
 
-    # Extra: quick audit table
-    audit_cols = ["FullName_A", "MatchedName_B", "Email", "EventName", "CreditHours", "MatchScore", "MatchSource"]
-    df_with_email_dedup[audit_cols].to_excel(out_path / "event_level_audit.xlsx", index=False)
 
-    print(f"Done. Outputs in: {out_path.resolve()}")
+# ---------------------------
+# Differential check (diffcheck)
+# ---------------------------
+
+# Accelerated implementations per target, compared against the reference path by `diffcheck`.
+# Matching candidates are factories called with the roster: make(df_b) -> callable.
+#   top_k_matches:        make(df_b) -> fn(name_a, k) -> [(row_index, score), ...]
+#   composite_name_score: make(df_b) -> fn(name_a, row_index) -> float
+#   apply_decisions:      fn(df_joined_events, dec, df_b) -> DataFrame
+#   aggregate_totals:     fn(df_joined_events, df_b) -> totals DataFrame (from event rows before the Email/Event dedupe)
+#   parse_credit_hours:   fn(raw_hours_column) -> float Series (NaN = not parseable)
+#   dedupe_file_a:        fn(df_a) -> deduplicated File A frame
+FAST_PATHS: Dict[str, Dict[str, object]] = {
+    "top_k_matches": {},
+    "composite_name_score": {},
+    "apply_decisions": {},
+    "aggregate_totals": {},
+    "parse_credit_hours": {},
+    "dedupe_file_a": {},
+}
+
+def register_fast_path(target: str, name: str):
+    """Decorator: register `fn` as accelerated candidate `name` for a diffcheck target."""
+    def deco(fn):
+        FAST_PATHS[target][name] = fn
+        return fn
+    return deco
+
+@register_fast_path("top_k_matches", "indexed")
+def _indexed_top_k_factory(df_b: pd.DataFrame):
+    index = RosterIndex(df_b)
+    return lambda name_a, k: top_k_matches_indexed(name_a, index, k)
+
+@register_fast_path("composite_name_score", "indexed")
+def _indexed_score_factory(df_b: pd.DataFrame):
+    index = RosterIndex(df_b)
+    return lambda name_a, j: index.score(RosterIndex.query_features(name_a), j)
+
+def _mapped_index_for(df_b: pd.DataFrame) -> "MappedRosterIndex":
+    """Round-trip df_b through a temporary roster index file, as build-index + --file_b <index> would."""
+    import tempfile
+
+    fd, tmp = tempfile.mkstemp(suffix=ROSTER_INDEX_SUFFIX)
+    os.close(fd)
+    try:
+        write_roster_index(df_b, df_b.iloc[0:0], tmp)
+        return open_roster_index(tmp)[2]
+    finally:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass  # still mapped on Windows; left to the OS temp cleanup
+
+@register_fast_path("top_k_matches", "mapped_index")
+def _mapped_top_k_factory(df_b: pd.DataFrame):
+    index = _mapped_index_for(df_b)
+    return lambda name_a, k: top_k_matches_indexed(name_a, index, k)
+
+@register_fast_path("composite_name_score", "mapped_index")
+def _mapped_score_factory(df_b: pd.DataFrame):
+    index = _mapped_index_for(df_b)
+    return lambda name_a, j: index.score(RosterIndex.query_features(name_a), j)
+
+register_fast_path("parse_credit_hours", "vectorized")(parse_credit_hours_series)
+register_fast_path("dedupe_file_a", "vectorized")(dedupe_exact_file_a)
+
+@register_fast_path("aggregate_totals", "ledger")
+def _ledger_aggregate(df_joined_events: pd.DataFrame, df_b: pd.DataFrame) -> pd.DataFrame:
+    """Load every row with an email into a throwaway ledger and total from it (the ledger does the dedupe)."""
+    has_email = df_joined_events["Email"].astype(str).str.strip() != ""
+    conn = open_ledger(":memory:")
+    try:
+        ledger_ingest(conn, with_display_name(df_joined_events[has_email], df_b), "diffcheck")
+        return ledger_totals(conn)
+    finally:
+        conn.close()
+
+def _reference_aggregate(df_joined_events: pd.DataFrame, df_b: pd.DataFrame) -> pd.DataFrame:
+    return aggregate_totals_by_email(dedupe_by_email_event(df_joined_events)[0], df_b)
+
+_DIFF_FIRST = [
+    "Michael", "Mike", "John", "Jon", "Johnathan", "Jonathan", "Elizabeth", "Liz", "Beth",
+    "Alexander", "Alex", "Sasha", "Patricia", "Pat", "Wan Jae", "Maria", "Ana", "Chen", "Li",
+    "Omar", "Sara", "José", "Anne-Marie", "Jae",
+]
+_DIFF_LAST = [
+    "Smith", "Jang", "Garcia", "O'Neil", "Nguyen", "van der Berg", "Kim", "Lopez", "Li",
+    "de la Cruz", "Smith-Jones", "Mc Donald", "Wan",
+]
+_DIFF_CATEGORIES = [("User", "Member"), ("User", "Student"), ("Exhibitor", "Booth"), ("Speaker", "Keynote"), ("Staff", "Ops")]
+
+def _diff_name_variant(rng, name: str) -> str:
+    """A File A style spelling of a roster name (case, order, spacing, nickname, initial, typo...)."""
+    parts = name.split()
+    kind = rng.randrange(9)
+    if kind == 0:
+        return name.upper()
+    if kind == 1 and len(parts) > 1:
+        return f"{parts[-1]}, {' '.join(parts[:-1])}"
+    if kind == 2:
+        return name.replace(" ", "")
+    if kind == 3 and len(parts) > 1:
+        return f"{parts[0][0]}. {parts[-1]}"
+    if kind == 4 and len(name) > 3:
+        i = rng.randrange(len(name))
+        return name[:i] + rng.choice("aeioxz") + name[i + 1:]
+    if kind == 5 and len(parts) > 1:
+        return " ".join(reversed(parts))
+    if kind == 6:
+        return f"  {name.lower()}  "
+    if kind == 7:
+        return name.replace("-", " ").replace("'", "")
+    return name
+
+def make_diff_roster(rng, n_rows: int) -> pd.DataFrame:
+    """Random collapsed-roster frame: repeated names, missing emails and email collisions included."""
+    rows = []
+    for i in range(n_rows):
+        name = f"{rng.choice(_DIFF_FIRST)} {rng.choice(_DIFF_LAST)}"
+        if rng.random() < 0.1:
+            name = f"{rng.choice(_DIFF_FIRST)} {name}"
+        cat, sub = rng.choice(_DIFF_CATEGORIES)
+        r = rng.random()
+        email = None if r < 0.08 else ("" if r < 0.1 else f"{name.split()[0].lower()}{i}@example.org")
+        rows.append([cat, sub, name, rng.choice(["US", "KR", "MX"]), email, "", rng.choice(["Yes", "No"])])
+    return pd.DataFrame(rows, columns=["Category", "Subcategory", "Full Name", "Country", "Email", "CC Email", "First Conference"])
+
+def make_diff_adversarial() -> Tuple[pd.DataFrame, list]:
+    """Hand-picked edge cases: blanks, punctuation-only, concatenations, duplicate tokens,
+    5+ tokens (no permutations), exact duplicates with/without email, non-string names,
+    diacritics and names long enough to trigger SequenceMatcher's autojunk heuristic."""
+    long_name = " ".join(["Maximilian"] * 25)
+    names = [
+        "Wan Jae Jang", "Jang Wan Jae", "Li Li", "Li", "O'Neil Smith", "ONeil Smith", "Mike Smith",
+        "Michael Smith", "Smith Michael", "", "   ", "---", None, 12345, "José Núñez", "Jose Nunez",
+        "A B C D E", "E D C B A", "Anne-Marie de la Cruz", "Annemarie Delacruz", long_name,
+        long_name + " Jr", "Pat Kim", "Patricia Kim", "Kim Pat", "Smith", "Smith",
+    ]
+    rows = []
+    for i, name in enumerate(names):
+        email = "" if i in (1, 9, 25) else (None if i in (3, 12) else f"adv{i}@example.org")
+        rows.append(["User", "Member", name, "US", email, "", "No"])
+    df_b = pd.DataFrame(rows, columns=["Category", "Subcategory", "Full Name", "Country", "Email", "CC Email", "First Conference"])
+    queries = [
+        "Jangwanjae", "JANG, Wan Jae", "Wanjaejang", "li li", "Li", "oneil smith", "O Neil Smith",
+        "Mike Smith", "Smith, Mike", "M. Smith", "", "   ", "!!!", "12345", "José Nunez", "jose nunez",
+        "ABCDE", "A B C D E", "Annemarie de la Cruz", "Anne Marie Delacruz", long_name, long_name.lower(),
+        "Pat Kim", "Kim, Patricia", "Smith", "Smyth", "Zed Unknown", "nan", "None",
+    ]
+    return df_b, queries
+
+def _diff_make_joined_events(rng, df_b: pd.DataFrame, names: list, n_rows: int) -> pd.DataFrame:
+    """Synthetic pre-decision event rows shaped like the pipeline's joined events."""
+    events = [f"Session {i}" for i in range(8)]
+    rows = []
+    for _ in range(n_rows):
+        b = df_b.iloc[rng.randrange(len(df_b))]
+        matched = rng.random() < 0.85
+        score = round(rng.choice([1.0, 1.0, 0.9, 0.875, rng.random()]), 3)
+        rows.append({
+            "FullName_A": rng.choice(names),
+            "EventName": rng.choice(events),
+            "CreditHours": rng.choice([0.5, 1.0, 1.5, 2.0, 2.25, 3.0]),
+            "MatchedName_B": b["Full Name"] if matched else "",
+            "Email": (b["Email"] if matched else "") or "",
+            "Category": b["Category"] if matched else "",
+            "Subcategory": b["Subcategory"] if matched else "",
+            "Country": b["Country"] if matched else "",
+            "CC Email": "",
+            "First Conference": b["First Conference"] if matched else "",
+            "MatchScore": score,
+            "MatchSource": "FUZZY_NAME" if matched else "FUZZY_NO_MATCH",
+            "ReviewFlag": "" if matched else "NO_MATCH_OR_LOW_SCORE",
+            "Confidence": score,
+            "AssumedEmail": "",
+            "AssumedName": "",
+        })
+    return pd.DataFrame(rows)
+
+def _diff_make_decisions(rng, df_b: pd.DataFrame, names: list) -> pd.DataFrame:
+    """Synthetic reviewer sheet (as returned by load_decisions) covering every Decision/Pick form."""
+    rows = []
+    emails = [e for e in df_b["Email"].fillna("").astype(str) if e]
+    for nm in names:
+        tops = [df_b.iloc[rng.randrange(len(df_b))] for _ in range(3)]
+        entry = {"FullName_A": nm}
+        for n, b in enumerate(tops, start=1):
+            entry[f"Top{n}_Name_B"] = b["Full Name"] if isinstance(b["Full Name"], str) else ""
+            entry[f"Top{n}_Email"] = b["Email"] if isinstance(b["Email"], str) else ""
+        entry["Suggested_Email"] = entry["Top1_Email"]
+        entry["Decision"] = rng.choice(["", "", "ACCEPT", "accept ", "REJECT", "maybe"])
+        entry["Pick"] = rng.choice(["", "", "1", "2", "3", "4", rng.choice(emails), "unknown@nowhere.org", "x"])
+        entry["Chosen_Email"] = rng.choice(["", "", "", rng.choice(emails), "typed@nowhere.org"])
+        rows.append(entry)
+    cols = ["FullName_A", "Suggested_Email", "Decision", "Chosen_Email",
+            "Top1_Name_B", "Top1_Email", "Top2_Name_B", "Top2_Email", "Top3_Name_B", "Top3_Email", "Pick"]
+    return pd.DataFrame(rows)[cols]
+
+def _diff_make_file_a(rng, names: list, n_rows: int) -> pd.DataFrame:
+    """Synthetic File A rows: mixed-type hours cells and name/event spellings that differ only in case/spacing."""
+    import datetime
+    hours = [
+        1, 2, 1.5, 2.25, 0.0, -0.0, True, 1e20, "2.0 Credit Hours", "1,5 PDH", " 3 ", "2.", "+2.5", "-1",
+        "1,000", "abc 4.25.3", "n/a", "", "   ", None, float("nan"), datetime.datetime(2024, 1, 2), "٣ hours",
+    ]
+    events = ["Session 1", "session 1 ", " SESSION 1", "Session 2", None, "nan"]
+    rows = []
+    for _ in range(n_rows):
+        nm = rng.choice(names)
+        if isinstance(nm, str) and rng.random() < 0.3:
+            nm = rng.choice([nm.upper(), f" {nm} ", nm.lower()])
+        rows.append([nm, rng.choice(hours), rng.choice(events)])
+    return pd.DataFrame(rows, columns=["FullName_A", "CreditHours", "EventName"])
+
+def _diff_missing(v) -> bool:
+    return pd.api.types.is_scalar(v) and bool(pd.isna(v))
+
+def _diff_same(a, b) -> bool:
+    """Exact equality, with NaN/None treated as equal only to each other."""
+    if _diff_missing(a) or _diff_missing(b):
+        return _diff_missing(a) and _diff_missing(b)
+    return bool(a == b)
+
+def _frame_divergences(ref: pd.DataFrame, cand: pd.DataFrame) -> list[tuple[str, str, object, object]]:
+    """Cell-by-cell differences as (row, column, reference, candidate); row order matters."""
+    out = []
+    if list(ref.columns) != list(cand.columns):
+        out.append(("-", "columns", list(ref.columns), list(cand.columns)))
+    if len(ref) != len(cand):
+        out.append(("-", "row_count", len(ref), len(cand)))
+    for pos in range(min(len(ref), len(cand))):
+        r, c = ref.iloc[pos], cand.iloc[pos]
+        for col in ref.columns:
+            if col in cand.columns and not _diff_same(r[col], c[col]):
+                out.append((str(pos), col, r[col], c[col]))
+    return out
+
+def run_differential_check(
+    out_dir: Optional[str] = None,
+    seed: int = 0,
+    roster_size: int = 400,
+    n_queries: int = 300,
+) -> pd.DataFrame:
+    """Run every registered accelerated path side by side with the reference implementation
+    on seeded random and adversarial datasets. Returns one row per divergence (empty when all agree)
+    and writes differential_report.xlsx to out_dir when given.
+    """
+    import random
+
+    rng = random.Random(seed)
+    df_rand = make_diff_roster(rng, roster_size)
+    rand_names = [n for n in df_rand["Full Name"] if isinstance(n, str)]
+    rand_queries = [_diff_name_variant(rng, rng.choice(rand_names)) for _ in range(n_queries)]
+    rand_queries += [f"{rng.choice(_DIFF_FIRST)} {rng.choice(_DIFF_LAST)}" for _ in range(n_queries // 5)]
+    df_adv, adv_queries = make_diff_adversarial()
+    datasets = [(f"random(seed={seed})", df_rand, rand_queries), ("adversarial", df_adv, adv_queries)]
+
+    divergences = []
+    checked: Dict[Tuple[str, str], int] = {}
+
+    def record(target, name, dataset, case, field, ref_val, cand_val):
+        divergences.append({
+            "Target": target, "Candidate": name, "Dataset": dataset, "Case": str(case),
+            "Field": field, "Reference": str(ref_val), "Candidate_Value": str(cand_val),
+        })
+
+    for dataset, df_b, queries in datasets:
+        emails = df_b["Email"].tolist()
+
+        # Ranks, scores and emails of Top-k
+        for name, make in FAST_PATHS["top_k_matches"].items():
+            fn = make(df_b)
+            for q in queries:
+                ref = top_k_matches(q, df_b, k=3)
+                got = fn(q, 3)
+                checked[("top_k_matches", name)] = checked.get(("top_k_matches", name), 0) + 1
+                if len(ref) != len(got):
+                    record("top_k_matches", name, dataset, q, "length", len(ref), len(got))
+                for rank, (r, g) in enumerate(zip(ref, got), start=1):
+                    if r[0] != g[0]:
+                        record("top_k_matches", name, dataset, q, f"Top{rank}_row", r[0], g[0])
+                        record("top_k_matches", name, dataset, q, f"Top{rank}_Email", emails[r[0]], emails[g[0]])
+                    if r[1] != g[1]:
+                        record("top_k_matches", name, dataset, q, f"Top{rank}_Score", repr(r[1]), repr(g[1]))
+
+        # Raw pairwise scores
+        b_names = df_b["Full Name"].fillna("").tolist()
+        pairs = [(q, rng.randrange(len(b_names))) for q in queries for _ in range(3)]
+        for name, make in FAST_PATHS["composite_name_score"].items():
+            fn = make(df_b)
+            for q, j in pairs:
+                checked[("composite_name_score", name)] = checked.get(("composite_name_score", name), 0) + 1
+                ref, got = composite_name_score(q, b_names[j]), fn(q, j)
+                if ref != got:
+                    record("composite_name_score", name, dataset, f"{q!r} vs {b_names[j]!r}", "score", repr(ref), repr(got))
+
+        # Decision loop and aggregation on synthetic event rows
+        events = _diff_make_joined_events(rng, df_b, queries, n_rows=max(50, len(queries) * 2))
+        dec = _diff_make_decisions(rng, df_b, sorted(set(queries)))
+        ref_dec = apply_decisions_event_level(events.copy(), dec, df_b)
+        for name, fn in FAST_PATHS["apply_decisions"].items():
+            checked[("apply_decisions", name)] = checked.get(("apply_decisions", name), 0) + 1
+            for row, col, r, g in _frame_divergences(ref_dec, fn(events.copy(), dec, df_b)):
+                record("apply_decisions", name, dataset, f"row {row}", col, r, g)
+        ref_tot = _reference_aggregate(ref_dec, df_b)
+        for name, fn in FAST_PATHS["aggregate_totals"].items():
+            checked[("aggregate_totals", name)] = checked.get(("aggregate_totals", name), 0) + 1
+            for row, col, r, g in _frame_divergences(ref_tot, fn(ref_dec.copy(), df_b)):
+                record("aggregate_totals", name, dataset, f"row {row}", col, r, g)
+
+        # File A ingestion: hour parsing, then exact dedupe on the parsed frame
+        raw_a = _diff_make_file_a(rng, queries, n_rows=max(50, len(queries) * 2))
+        ref_hours = raw_a["CreditHours"].apply(parse_credit_hours).astype(float)
+        for name, fn in FAST_PATHS["parse_credit_hours"].items():
+            checked[("parse_credit_hours", name)] = checked.get(("parse_credit_hours", name), 0) + 1
+            got = fn(raw_a["CreditHours"])
+            for pos, (r, g) in enumerate(zip(ref_hours, got)):
+                if not (_diff_same(r, g) and (_diff_missing(r) or repr(r) == repr(g))):
+                    record("parse_credit_hours", name, dataset, repr(raw_a["CreditHours"].iloc[pos]), "CreditHours", repr(r), repr(g))
+        parsed_a = raw_a.assign(CreditHours=ref_hours).dropna(subset=["FullName_A", "CreditHours"])
+        ref_a = _reference_dedupe_exact_file_a(parsed_a)
+        for name, fn in FAST_PATHS["dedupe_file_a"].items():
+            checked[("dedupe_file_a", name)] = checked.get(("dedupe_file_a", name), 0) + 1
+            got = fn(parsed_a)
+            if list(ref_a.index) != list(got.index):
+                record("dedupe_file_a", name, dataset, "kept rows", "index", list(ref_a.index), list(got.index))
+            for row, col, r, g in _frame_divergences(ref_a, got):
+                record("dedupe_file_a", name, dataset, f"row {row}", col, r, g)
+
+    report = pd.DataFrame(divergences, columns=["Target", "Candidate", "Dataset", "Case", "Field", "Reference", "Candidate_Value"])
+    for target, candidates in FAST_PATHS.items():
+        if not candidates:
+            print(f"[diffcheck] {target}: no accelerated path registered")
+        for name in candidates:
+            n_div = int(((report["Target"] == target) & (report["Candidate"] == name)).sum())
+            status = "OK" if n_div == 0 else f"{n_div} divergence(s)"
+            print(f"[diffcheck] {target} / {name}: {checked.get((target, name), 0)} case(s) checked, {status}")
+    if out_dir:
+        out_path = Path(out_dir)
+        out_path.mkdir(parents=True, exist_ok=True)
+        report.to_excel(out_path / "differential_report.xlsx", index=False)
+        print(f"[diffcheck] Report: {(out_path / 'differential_report.xlsx').resolve()}")
+    return report
+
+def cmd_diffcheck(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="run_me_nocerts.py diffcheck",
+        description="Check accelerated matching/aggregation paths against the reference implementation.",
+    )
+    parser.add_argument("--out_dir", default="output_nocerts", help="Where to write differential_report.xlsx")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the randomized datasets")
+    parser.add_argument("--roster_size", type=int, default=400, help="Rows in the random roster")
+    parser.add_argument("--queries", type=int, default=300, help="Random File A names to match")
+    args = parser.parse_args(argv)
+    report = run_differential_check(args.out_dir, seed=args.seed, roster_size=args.roster_size, n_queries=args.queries)
+    return 1 if not report.empty else 0
+
+def run_engine_benchmark(
+    df_b: pd.DataFrame,
+    names: list,
+    engines: list[str],
+    sample: int = 200,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Time each match engine on `names` and measure its agreement with the reference engine.
+
+    The reference is only run on a seeded sample of the names (it is the slow one); speedup is per name.
+    Top1_Agreement: same Top1 row. Top3_Recall: share of the reference Top-3 rows the engine also returned.
+    Exact_Top3: identical (row, score) list.
+    """
+    import random
+
+    names = list(dict.fromkeys(str(n) for n in names))
+    sample_names = random.Random(seed).sample(names, min(sample, len(names)))
+
+    t0 = time.perf_counter()
+    reference = dict(make_matcher(df_b, "reference")(sample_names))
+    ref_per_name = (time.perf_counter() - t0) / max(1, len(sample_names))
+
+    rows = [{
+        "Engine": "reference", "Roster_Rows": len(df_b), "Names": len(sample_names), "Build_s": 0.0,
+        "Match_s": round(ref_per_name * len(sample_names), 3), "Per_Name_ms": round(ref_per_name * 1000, 3),
+        "Speedup_vs_Reference": 1.0, "Top1_Agreement": 1.0, "Top3_Recall": 1.0, "Exact_Top3": 1.0,
+    }]
+    for engine in engines:
+        t0 = time.perf_counter()
+        match_many = make_matcher(df_b, engine)
+        build_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        got = dict(match_many(names))
+        per_name = (time.perf_counter() - t0) / max(1, len(names))
+        top1 = recall = exact = 0.0
+        for nm in sample_names:
+            ref, cand = reference[nm], got[nm]
+            top1 += bool(ref and cand and ref[0][0] == cand[0][0])
+            ref_rows = {i for i, _ in ref}
+            recall += (len(ref_rows & {i for i, _ in cand}) / len(ref_rows)) if ref_rows else 1.0
+            exact += ref == cand
+        n = max(1, len(sample_names))
+        rows.append({
+            "Engine": engine, "Roster_Rows": len(df_b), "Names": len(names), "Build_s": round(build_s, 3),
+            "Match_s": round(per_name * len(names), 3), "Per_Name_ms": round(per_name * 1000, 3),
+            "Speedup_vs_Reference": round(ref_per_name / per_name, 1) if per_name else float("inf"),
+            "Top1_Agreement": round(top1 / n, 4), "Top3_Recall": round(recall / n, 4), "Exact_Top3": round(exact / n, 4),
+        })
+    return pd.DataFrame(rows)
+
+def cmd_engine_bench(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="run_me_nocerts.py engine-bench",
+        description="Measure speed and Top-k recall of the match engines against the reference engine.",
+    )
+    parser.add_argument("--file_a", required=False, help="File A to take names from (default: synthetic names)")
+    parser.add_argument("--file_b", required=False, help="File B roster (default: synthetic roster)")
+    parser.add_argument("--out_dir", default="output_nocerts", help="Where to write engine_benchmark.xlsx")
+    parser.add_argument("--engines", default="indexed,trigram", help="Comma-separated engines to compare with the reference")
+    parser.add_argument("--sample", type=int, default=200, help="Names also run through the (slow) reference engine")
+    parser.add_argument("--roster_size", type=int, default=5000, help="Synthetic roster rows (without --file_b)")
+    parser.add_argument("--queries", type=int, default=1000, help="Synthetic File A names (without --file_a)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    import random
+
+    rng = random.Random(args.seed)
+    if args.file_b:
+        df_b, _, roster_index = load_roster_source(args.file_b)
+        for message in getattr(roster_index, "warnings", ()):
+            print(f"Warning: {message}")
+    else:
+        df_b = make_diff_roster(rng, args.roster_size)
+    if args.file_a:
+        names = dedupe_exact_file_a(load_file_a(args.file_a))["FullName_A"].astype(str).tolist()
+    else:
+        roster_names = [n for n in df_b["Full Name"] if isinstance(n, str)]
+        names = [_diff_name_variant(rng, rng.choice(roster_names)) for _ in range(args.queries)]
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+
+    report = run_engine_benchmark(df_b, names, engines, sample=args.sample, seed=args.seed)
+    print(report.to_string(index=False))
+    out_path = Path(args.out_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+    report.to_excel(out_path / "engine_benchmark.xlsx", index=False)
+    print(f"Report: {(out_path / 'engine_benchmark.xlsx').resolve()}")
+    return 0
+
+# Sub-commands selected by the first argument, e.g. `run_me_nocerts.py diffcheck --seed 3`
+COMMANDS = {
+    "diffcheck": cmd_diffcheck,
+    "engine-bench": cmd_engine_bench,
+    "build-index": cmd_build_index,
+    "ledger-export": cmd_ledger_export,
+}
 
 
 def main():
@@ -889,16 +3220,36 @@ def main():
     if len(sys.argv) == 1:
         launch_gui()
         return
+    if sys.argv[1] in COMMANDS:
+        sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
     parser = argparse.ArgumentParser(
         description="Prepare credit-hour master list (no certificates) with email-based canonicalization."
     )
     parser.add_argument("--file_a", required=False, help="Path to File A (Name, Hours, Event)")
-    parser.add_argument("--file_b", required=False, help="Path to File B (Category, Subcategory, Full Name, Country, Email, CC Email, First Conference)")
+    parser.add_argument("--file_b", required=False, help="Path to File B (Category, Subcategory, Full Name, Country, Email, CC Email, First Conference), or a roster index file from build-index")
     parser.add_argument("--out_dir", default="output_nocerts", help="Output directory path")
-    parser.add_argument("--category", required=False, help="Optional Category filter (e.g., 'User')")
+    parser.add_argument("--category", required=False, help="Optional Category filter (e.g., 'User' or 'User,Speaker')")
+    parser.add_argument("--partition_by", choices=sorted(PARTITION_MODES), required=False,
+                        help="Also write one master list per Category ('category') or Category/Subcategory ('subcategory')")
     parser.add_argument("--min_match", type=float, default=0.85, help="Minimum fuzzy match score (0-1)")
     parser.add_argument("--overrides_csv", required=False, help="Path to manual_overrides.csv (optional)")
     parser.add_argument("--decisions_path", required=False, help="Path to decisions file (use proposed_matches.xlsx or a CSV). Optional.")
+    parser.add_argument("--engine", choices=MATCH_ENGINES, default="reference",
+                        help="Name matching engine: reference (default), indexed (same results, faster), trigram (approximate, fastest; needs scipy)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write cProfile stats, a flamegraph-ready collapsed-stack file and matching counters to the output folder")
+    parser.add_argument("--progressive", action="store_true",
+                        help="Match names without an exact roster match first and write partial proposals to <out_dir>/partial/ while matching runs")
+    parser.add_argument("--flush_seconds", type=float, default=30.0,
+                        help="With --progressive: how often to write a new partial proposals file (default 30)")
+    parser.add_argument("--cluster_names", action="store_true",
+                        help="Match one representative per group of File A spellings of the same name (e.g. 'Mike Smith', 'Smith, Michael') and reuse its matches for the variants")
+    parser.add_argument("--ledger", required=False,
+                        help="Also record this run's deduplicated credit hours in a ledger file (created if missing); see ledger-export")
+    parser.add_argument("--event_date", required=False,
+                        help="With --ledger: date of File A's events (YYYY-MM-DD; default: date first recorded)")
+    parser.add_argument("--ledger_batch", required=False,
+                        help="With --ledger: name this File A's batch (default: its content hash); a later run with the same name replaces it, e.g. after editing File A")
     parser.add_argument("--gui", action="store_true", help="Launch graphical app instead of CLI")
     args = parser.parse_args()
 
@@ -919,6 +3270,15 @@ def main():
         category_filter=args.category,
         overrides_csv=args.overrides_csv,
         decisions_path=args.decisions_path,
+        partition_by=args.partition_by,
+        profile=args.profile,
+        match_engine=args.engine,
+        cluster_names=args.cluster_names,
+        progressive=args.progressive,
+        flush_seconds=args.flush_seconds,
+        ledger_path=args.ledger,
+        event_date=args.event_date,
+        ledger_batch=args.ledger_batch,
     )
 
 